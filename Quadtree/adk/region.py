@@ -9,7 +9,12 @@ X = 0
 Y = 1
 
 class Region:
-    """Represents region in Cartesian space"""
+    """
+    Represents region in Cartesian space. Regions are treated as immutable once
+    constructed, since their center and half-size are computed up front.
+    """
+    
+    __slots__ = ('x_min', 'y_min', 'x_max', 'y_max', 'x_center', 'y_center', 'x_half', 'y_half')
 
     def __init__(self, xmin,ymin, xmax,ymax):   
         """
@@ -20,6 +25,11 @@ class Region:
         self.y_min = ymin if ymin < ymax else ymax
         self.x_max = xmax if xmax > xmin else xmin
         self.y_max = ymax if ymax > ymin else ymin
+        
+        self.x_center = (self.x_min + self.x_max)//2
+        self.y_center = (self.y_min + self.y_max)//2
+        self.x_half = (self.x_max - self.x_min)//2
+        self.y_half = (self.y_max - self.y_min)//2
 
     def copy(self):
         """Return copy of region"""
@@ -102,7 +112,8 @@ class Region:
     def __eq__(self, other):
         """Standard equality check."""
         if isinstance(other, self.__class__):
-            return self.__dict__ == other.__dict__
+            return (self.x_min == other.x_min and self.y_min == other.y_min and
+                    self.x_max == other.x_max and self.y_max == other.y_max)
         else:
             return False
 
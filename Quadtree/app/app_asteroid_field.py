@@ -26,7 +26,7 @@ from tkinter import Tk, Canvas
 
 from adk.region import Region, minValue, maxValue, X, Y
 from quadtree.quad import QuadTree
-from quadtree.util import RADIUS, DX, DY, defaultCollision
+from quadtree.util import RADIUS, DX, DY, defaultCollision, preorder
 
 # Refresh every 40 milliseconds
 frameDelay = 40
@@ -199,21 +199,27 @@ class AsteroidsApp:
                                 x + 2, self.toTk(y + 2),
                                 fill='black', tag=SHIP)
                 
-    def updateShape(self, shape):
-        """Move a given shape based on velocity and move shapes through boundaries."""
+    def nextLocation(self, shape):
+        """Compute next (x,y) location of shape based on velocity, moving through boundaries."""
         if shape[X] <= self.tree.region.x_min:
-            shape[X] = self.tree.region.x_max + shape[DX]
+            x = self.tree.region.x_max + shape[DX]
         elif shape[X]  >= self.tree.region.x_max:
-            shape[X] = self.tree.region.x_min + shape[DX]
+            x = self.tree.region.x_min + shape[DX]
         else:
-            shape[X] = shape[X] + shape[DX]
+            x = shape[X] + shape[DX]
             
         if shape[Y]  <= self.tree.region.y_min:
-            shape[Y] = self.tree.region.y_max + shape[DY]
+            y = self.tree.region.y_max + shape[DY]
         elif shape[Y]  >= self.tree.region.y_max:
-            shape[Y] = self.tree.region.y_min + shape[DY]
+            y = self.tree.region.y_min + shape[DY]
         else:
-            shape[Y] = shape[Y] + shape[DY]
+            y = shape[Y] + shape[DY]
+        
+        return (x, y)
+    
+    def updateShape(self, shape):
+        """Move a given shape based on velocity and move shapes through boundaries."""
+        shape[X], shape[Y] = self.nextLocation(shape)
 
     def start(self, event):
         """Restart."""
@@ -223,21 +229,16 @@ class AsteroidsApp:
         self.init()
 
     def visit(self, node):
-        """Visit nodes recursively."""
-        if node == None: 
-            return
-
-        # Draw each circle, colored appropriately
-        for circle in node.circles:
-            self.canvas.create_oval(circle[X] - circle[RADIUS], self.toTk(circle[Y]) - circle[RADIUS], 
-                                 circle[X] + circle[RADIUS], self.toTk(circle[Y]) + circle[RADIUS],
-                                 tag=ASTEROID)
-                        
-        for n in node.children:
-            self.visit(n)
+        """Visit nodes in pre-order."""
+        for node in preorder(node):
+            # Draw each circle, colored appropriately
+            for circle in node.circles:
+                self.canvas.create_oval(circle[X] - circle[RADIUS], self.toTk(circle[Y]) - circle[RADIUS], 
+                                     circle[X] + circle[RADIUS], self.toTk(circle[Y]) + circle[RADIUS],
+                                     tag=ASTEROID)
             
     def updateLocations(self):
-        """Move all circles, reconstruct QuadTree and repaint."""
+        """Move all circles within QuadTree and repaint."""
         if self.ship is None:
             self.init()
             
@@ -245,7 +246,7 @@ class AsteroidsApp:
         if self.status == PLAYING:
             self.master.after(frameDelay, self.updateLocations)
 
-        if self.tree.root is None:
+        if len(self.tree) == 0:
             self.bullets = []
             self.status = WON
             self.canvas.delete(BULLET)
@@ -268,15 +269,9 @@ class AsteroidsApp:
                         self.tree.add(c2)
                         self.tree.add(c3)
         
-        # Destroy tree each time and reinsert all circles with new locations
-        nodes = self.tree.root.preorder()
-        self.tree = QuadTree(Region(0,0,512,512))
-        for n in nodes:
-            for c in n.circles:
-                
-                # Move from one side to the other, top and bottom
-                self.updateShape(c)
-                self.tree.add(c)
+        # Move all asteroids within tree, which only relocates those that leave 
+        # their node. Asteroids move from one side to the other, top and bottom
+        self.tree.update([(c,) + self.nextLocation(c) for c in list(self.tree)])
 
         # Update our location and the bullets                
         self.updateShip()
@@ -14,6 +14,7 @@ from tkinter import Tk, Canvas, ALL
 
 from adk.region import Region, minValue, maxValue, X, Y
 from quadtree.quad_point import QuadTree
+from quadtree.util import preorder
 from quadtree.visualize import VisualizationWindow
 
 def label(node):
@@ -100,37 +101,33 @@ class QuadTreePointApp:
         self.viz.clear()
         
     def visit(self, node):
-        """Visit nodes recursively."""
-        if node == None: 
-            return
-
-        # draw rectangular region with criss-crossed hashed lines 
-        r = node.region
-        self.canvas.create_rectangle(self.factor * r.x_min,
-                                     self.factor * self.toTk(r.y_min),
-                                     self.factor * r.x_max, 
-                                     self.factor * self.toTk(r.y_max))
+        """Visit nodes in pre-order."""
+        for node in preorder(node):
+            # draw rectangular region with criss-crossed hashed lines 
+            r = node.region
+            self.canvas.create_rectangle(self.factor * r.x_min,
+                                         self.factor * self.toTk(r.y_min),
+                                         self.factor * r.x_max, 
+                                         self.factor * self.toTk(r.y_max))
          
-        self.canvas.create_line(self.factor * r.x_min,
-                                self.toTk(self.factor * node.origin[Y]),
-                                self.factor * r.x_max,
-                                self.toTk(self.factor * node.origin[Y]),
-                                dash=(2, 4)) 
-        self.canvas.create_line(self.factor * node.origin[X],
-                                self.toTk(self.factor * r.y_min),
-                                self.factor * node.origin[X],
-                                self.toTk(self.factor * r.y_max),
-                                dash=(2, 4))
+            self.canvas.create_line(self.factor * r.x_min,
+                                    self.toTk(self.factor * node.origin[Y]),
+                                    self.factor * r.x_max,
+                                    self.toTk(self.factor * node.origin[Y]),
+                                    dash=(2, 4)) 
+            self.canvas.create_line(self.factor * node.origin[X],
+                                    self.toTk(self.factor * r.y_min),
+                                    self.factor * node.origin[X],
+                                    self.toTk(self.factor * r.y_max),
+                                    dash=(2, 4))
          
-        if node.points:
-            for pt in node.points:
-                self.canvas.create_rectangle(self.factor * pt[X],
-                                             self.toTk(self.factor * pt[Y]),
-                                             self.factor * (pt[X]+1),
-                                             self.toTk(self.factor * (pt[Y]+1)),
-                                             fill='black')
-        for n in node.children:
-            self.visit(n)
+            if node.points:
+                for pt in node.points:
+                    self.canvas.create_rectangle(self.factor * pt[X],
+                                                 self.toTk(self.factor * pt[Y]),
+                                                 self.factor * (pt[X]+1),
+                                                 self.toTk(self.factor * (pt[Y]+1)),
+                                                 fill='black')
             
 if __name__ == '__main__':
     root = Tk()
@@ -4,6 +4,7 @@
 
 from tkinter import Tk, Canvas, ALL
 from quadtree.quad0 import QuadTree
+from quadtree.util import preorder
 from adk.region import Region, minValue, maxValue, X, Y
 
 from quadtree.visualize import VisualizationWindow
@@ -61,38 +62,34 @@ class QuadTreePointApp:
         self.viz.clear()
         
     def visit (self, node):
-        """Visit nodes recursively."""
-        if node == None: 
-            return
-
-        # draw rectangular region with criss-crossed hashed lines 
-        r = node.region
-        self.canvas.create_rectangle(64 * r.x_min,
-                                     64 * self.toTk(r.y_min),
-                                     64 * r.x_max, 
-                                     64 * self.toTk(r.y_max))
+        """Visit nodes in pre-order."""
+        for node in preorder(node):
+            # draw rectangular region with criss-crossed hashed lines 
+            r = node.region
+            self.canvas.create_rectangle(64 * r.x_min,
+                                         64 * self.toTk(r.y_min),
+                                         64 * r.x_max, 
+                                         64 * self.toTk(r.y_max))
          
-        self.canvas.create_line(64 * r.x_min,
-                                self.toTk(64 * node.origin[Y]),
-                                64 * r.x_max,
-                                self.toTk(64 * node.origin[Y]),
-                                dash=(2,4)) 
-        self.canvas.create_line(64 * node.origin[X],
-                                self.toTk(64 * r.y_min),
-                                64 * node.origin[X],
-                                self.toTk(64 * r.y_max),
-                                dash=(2,4))
+            self.canvas.create_line(64 * r.x_min,
+                                    self.toTk(64 * node.origin[Y]),
+                                    64 * r.x_max,
+                                    self.toTk(64 * node.origin[Y]),
+                                    dash=(2,4)) 
+            self.canvas.create_line(64 * node.origin[X],
+                                    self.toTk(64 * r.y_min),
+                                    64 * node.origin[X],
+                                    self.toTk(64 * r.y_max),
+                                    dash=(2,4))
          
-        if node.isPoint() or node.full:
-            pt = [node.region.x_min, node.region.y_min]
-            width = node.region.x_max - node.region.x_min
-            self.canvas.create_rectangle(64 * pt[X],
-                                         self.toTk(64 * pt[Y]),
-                                         64 * (pt[X]+width),
-                                         self.toTk(64 * (pt[Y]+width)),
-                                         fill='black')
-        for n in node.children:
-            self.visit(n)
+            if node.isPoint() or node.full:
+                pt = [node.region.x_min, node.region.y_min]
+                width = node.region.x_max - node.region.x_min
+                self.canvas.create_rectangle(64 * pt[X],
+                                             self.toTk(64 * pt[Y]),
+                                             64 * (pt[X]+width),
+                                             self.toTk(64 * (pt[Y]+width)),
+                                             fill='black')
             
 if __name__ == '__main__':
     root = Tk()
@@ -10,7 +10,7 @@ from tkinter import Tk, Canvas, ALL
 
 from adk.region import Region, minValue, maxValue, X, Y
 from quadtree.quad import QuadTree
-from quadtree.util import RADIUS, MULTIPLE, HIT
+from quadtree.util import RADIUS, MULTIPLE, HIT, preorder
 from quadtree.visualize import VisualizationWindow
      
 
@@ -79,31 +79,27 @@ class QuadTreeFixedApp:
         self.viz.clear()
         
     def visit (self, node):
-        """Visit nodes recursively."""
-        if node == None: 
-            return
-
-        # draw rectangular region with criss-crossed hashed lines 
-        r = node.region
-        self.canvas.create_rectangle(r.x_min, self.toTk(r.y_min), 
-                                     r.x_max, self.toTk(r.y_max))
+        """Visit nodes in pre-order."""
+        for node in preorder(node):
+            # draw rectangular region with criss-crossed hashed lines 
+            r = node.region
+            self.canvas.create_rectangle(r.x_min, self.toTk(r.y_min), 
+                                         r.x_max, self.toTk(r.y_max))
          
-        self.canvas.create_line(r.x_min, self.toTk(node.origin[Y]), 
-                                r.x_max, self.toTk(node.origin[Y]),
-                                dash=(2, 4))
-        self.canvas.create_line(node.origin[X], self.toTk(r.y_min), 
-                                node.origin[X], self.toTk(r.y_max),
-                                dash=(2, 4))
+            self.canvas.create_line(r.x_min, self.toTk(node.origin[Y]), 
+                                    r.x_max, self.toTk(node.origin[Y]),
+                                    dash=(2, 4))
+            self.canvas.create_line(node.origin[X], self.toTk(r.y_min), 
+                                    node.origin[X], self.toTk(r.y_max),
+                                    dash=(2, 4))
          
-        for circle in node.circles:
-            markColor = 'black'
-            if circle[MULTIPLE]: markColor = 'blue'
-            if circle[HIT]: markColor = 'red'
-            self.canvas.create_oval(circle[X] - circle[RADIUS], self.toTk(circle[Y]) - circle[RADIUS], 
-                                 circle[X] + circle[RADIUS], self.toTk(circle[Y]) + circle[RADIUS], 
-                                 fill=markColor)
-        for n in node.children:
-            self.visit(n)
+            for circle in node.circles:
+                markColor = 'black'
+                if circle[MULTIPLE]: markColor = 'blue'
+                if circle[HIT]: markColor = 'red'
+                self.canvas.create_oval(circle[X] - circle[RADIUS], self.toTk(circle[Y]) - circle[RADIUS], 
+                                     circle[X] + circle[RADIUS], self.toTk(circle[Y]) + circle[RADIUS], 
+                                     fill=markColor)
             
 if __name__ == '__main__':
     root = Tk()
@@ -15,7 +15,7 @@ from tkinter import Tk, Canvas, ALL
 
 from adk.region import Region, minValue, maxValue, X, Y
 from quadtree.quad import QuadTree
-from quadtree.util import RADIUS, MULTIPLE, HIT, DX, DY, ID, LINE
+from quadtree.util import RADIUS, MULTIPLE, HIT, DX, DY, ID, LINE, preorder
 from quadtree.visualize import VisualizationWindow
 
 # Refresh every 40 milliseconds
@@ -108,81 +108,77 @@ class QuadTreeFixedApp:
             self.master.title(QuadTreeFixedApp.pausedTitle) 
 
     def visit(self, node):
-        """Visit nodes recursively."""
-        if node == None: 
-            return
-
-        # draw rectangular region with criss-crossed hashed lines 
-        r = node.region
-        self.canvas.create_rectangle(r.x_min, self.toTk(r.y_min), 
-                                     r.x_max, self.toTk(r.y_max), tag=LINE)
-         
-        self.canvas.create_line(r.x_min, self.toTk(node.origin[Y]), 
-                                r.x_max, self.toTk(node.origin[Y]),
-                                dash=(2, 4), tag=LINE) 
-        self.canvas.create_line(node.origin[X], self.toTk(r.y_min), 
-                                node.origin[X], self.toTk(r.y_max),
-                                dash=(2, 4), tag=LINE)
+        """Visit nodes in pre-order."""
+        for node in preorder(node):
+            # draw rectangular region with criss-crossed hashed lines 
+            r = node.region
+            self.canvas.create_rectangle(r.x_min, self.toTk(r.y_min), 
+                                         r.x_max, self.toTk(r.y_max), tag=LINE)
          
-        for n in node.children:
-            self.visit(n)
+            self.canvas.create_line(r.x_min, self.toTk(node.origin[Y]), 
+                                    r.x_max, self.toTk(node.origin[Y]),
+                                    dash=(2, 4), tag=LINE) 
+            self.canvas.create_line(node.origin[X], self.toTk(r.y_min), 
+                                    node.origin[X], self.toTk(r.y_max),
+                                    dash=(2, 4), tag=LINE)
             
     def updateLocations(self):
-        """Move all circles, reconstruct QuadTree and repaint."""
+        """Move all circles within QuadTree and repaint."""
         if not self.paused:
             self.master.after(frameDelay, self.updateLocations)
 
         if self.tree.root is None: return
         
-        # Destroy tree each time and reinsert all circles, taking care to reset 
-        # collision status (HIT) and whether stored by interior node (MULTIPLE).
-        nodes = self.tree.root.preorder()
-        self.tree = QuadTree(Region(0,0,512,512))
-        for n in nodes:
-            for c in n.circles:
-                c[HIT] = False
+        # Move each circle within tree, which only relocates circles that leave 
+        # their node. Reset collision status (HIT) for all circles.
+        moves = []
+        for c in list(self.tree):
+            c[HIT] = False
+            
+            dx = dy = 0
+            if c[X] - c[RADIUS] + c[DX] <= self.tree.region.x_min:
+                c[DX] = -c[DX]
+            elif c[X] + c[RADIUS] + c[DX] >= self.tree.region.x_max:
+                c[DX] = -c[DX]
+            else:
+                dx = c[DX] 
                 
-                dx = dy = 0
-                if c[X] - c[RADIUS] + c[DX] <= self.tree.region.x_min:
-                    c[DX] = -c[DX]
-                elif c[X] + c[RADIUS] + c[DX] >= self.tree.region.x_max:
-                    c[DX] = -c[DX]
-                else:
-                    c[X] = c[X] + c[DX]
-                    dx = c[DX] 
-                    
-                if c[Y] - c[RADIUS] + c[DY] <= self.tree.region.y_min:
-                    c[DY] = -c[DY]
-                elif c[Y] + c[RADIUS] + c[DY] >= self.tree.region.y_max:
-                    c[DY] = -c[DY]
-                else:
-                    c[Y] = c[Y] + c[DY]
-                    dy = c[DY]
-                    
-                # Update hit status for all colliding circles, based on 
-                # newly added circle.
-                for circ in self.tree.collide(c):
-                    circ[HIT] = True
-                    self.canvas.itemconfig(circ[ID], fill='red')
-                    c[HIT] = True
+            if c[Y] - c[RADIUS] + c[DY] <= self.tree.region.y_min:
+                c[DY] = -c[DY]
+            elif c[Y] + c[RADIUS] + c[DY] >= self.tree.region.y_max:
+                c[DY] = -c[DY]
+            else:
+                dy = c[DY]
+            
+            moves.append((c, dx, dy))
+        
+        dropped = self.tree.update([(c, c[X] + dx, c[Y] + dy) for c, dx, dy in moves])
+        moved = [(c, dx, dy) for c, dx, dy in moves if all(c is not d for d in dropped)]
+        for c in dropped:
+            if c[ID] is not None:
+                self.canvas.delete(c[ID])
+            
+        # Update hit status for all colliding circles once all have moved.
+        for c1, c2 in self.tree.allPairs():
+            c1[HIT] = True
+            c2[HIT] = True
                     
-                self.tree.add(c)
-                
-                # Update visual for circle, either creating anew or moving. Fill color
-                # is based on whether colliding (RED) or stored in interior node (BLUE)
-                markColor = 'black'
-                if c[MULTIPLE]: markColor = 'blue'
-                if c[HIT]: markColor = 'red'
-                
-                if c[ID] is None:
-                    c[ID] = self.canvas.create_oval(c[X] - c[RADIUS], 
-                                 self.toTk(c[Y]) - c[RADIUS], 
-                                 c[X] + c[RADIUS], self.toTk(c[Y]) + c[RADIUS],
-                                 fill=markColor) 
-                else:
-                    # dy is Cartesian, but tk is opposite in y-direction 
-                    self.canvas.move(c[ID], dx, -dy)
-                    self.canvas.itemconfig(c[ID], fill=markColor)
+        for c, dx, dy in moved:
+            # Update visual for circle, either creating anew or moving. Fill color
+            # is based on whether colliding (RED) or stored in interior node (BLUE)
+            markColor = 'black'
+            if c[MULTIPLE]: markColor = 'blue'
+            if c[HIT]: markColor = 'red'
+            
+            if c[ID] is None:
+                c[ID] = self.canvas.create_oval(c[X] - c[RADIUS], 
+                             self.toTk(c[Y]) - c[RADIUS], 
+                             c[X] + c[RADIUS], self.toTk(c[Y]) + c[RADIUS],
+                             fill=markColor) 
+            else:
+                # dy is Cartesian, but tk is opposite in y-direction 
+                self.canvas.move(c[ID], dx, -dy)
+                self.canvas.itemconfig(c[ID], fill=markColor)
                 
         # recreate entire visualization by deleting lines and moving circles
         self.canvas.delete(LINE)
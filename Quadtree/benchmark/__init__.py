@@ -0,0 +1,10 @@
+"""
+Benchmarks for the quadtree structures, run from the command line with
+
+    python -m benchmark --sizes 1000 10000 --output results.json
+
+Each case times one operation (such as building a QuadTree, or colliding a
+batch of targets against it) over the circles of a named workload. Results
+are written as JSON and can be compared against a stored baseline, so that
+regressions are flagged from one release to the next.
+"""
@@ -0,0 +1,61 @@
+"""
+Command line interface to the benchmarks. Run from the directory containing the
+benchmark package, for example
+
+    python -m benchmark --case 'quad.*' --sizes 1000 100000 --output now.json
+    python -m benchmark --baseline now.json --tolerance 0.2
+
+Exit status is 1 when any measurement regresses against the baseline.
+"""
+
+import argparse
+import sys
+
+from benchmark.harness import CASES, run, compare, save, load
+from benchmark.workloads import WORKLOADS
+
+def main(args=None):
+    """Run benchmarks as directed by command line args, returning exit status."""
+    parser = argparse.ArgumentParser(prog='python -m benchmark', description='Time quadtree structures.')
+    parser.add_argument('--case', nargs='*', help='glob patterns selecting cases (default all)')
+    parser.add_argument('--workload', nargs='*', help='glob patterns selecting workloads (default all)')
+    parser.add_argument('--sizes', nargs='+', type=int, default=[1000, 10000], help='numbers of circles')
+    parser.add_argument('--targets', type=int, default=1000, help='number of target circles')
+    parser.add_argument('--repeat', type=int, default=5, help='measurements of each case')
+    parser.add_argument('--seed', type=int, default=0, help='seed for generating workloads')
+    parser.add_argument('--output', help='write results to this JSON file')
+    parser.add_argument('--baseline', help='compare results against this JSON file')
+    parser.add_argument('--tolerance', type=float, default=0.1, help='allowed slowdown before flagging regression')
+    parser.add_argument('--list', action='store_true', help='list cases and workloads, then exit')
+    options = parser.parse_args(args)
+
+    if options.list:
+        print ('cases:', ' '.join(CASES))
+        print ('workloads:', ' '.join(WORKLOADS))
+        return 0
+
+    baseline = load(options.baseline) if options.baseline else None
+
+    print ('case', 'workload', 'n', 'best(ms)', 'median(ms)')
+    def report(result):
+        print ("%s %s %d %5.4f %5.4f" % (result['case'], result['workload'], result['n'],
+                                         1000*result['best'], 1000*result['median']))
+        sys.stdout.flush()
+
+    document = run(options.case, options.workload, options.sizes, options.repeat, options.seed,
+                   options.targets, report)
+    if options.output:
+        save(document, options.output)
+
+    if baseline is None:
+        return 0
+
+    regressions = compare(document, baseline, options.tolerance)
+    for result, base in regressions:
+        print ("REGRESSION %s %s %d: %5.4f ms, baseline %5.4f ms" % (result['case'], result['workload'],
+                                                                    result['n'], 1000*result['best'],
+                                                                    1000*base['best']))
+    return 1 if regressions else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
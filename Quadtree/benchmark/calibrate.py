@@ -0,0 +1,103 @@
+"""
+Calibrate the thresholds used by quadtree.broadphase.Broadphase on this machine,
+run from the command line with
+
+    python -m benchmark.calibrate --output broadphase.json
+
+Every broadphase method is timed on the sparse workload at doubling sizes, which
+decides up to how many circles the naive and columnar methods are used. Grid and
+quadtree are then raced on sparse against powerlaw (widely varying radii), and
+columnar against both on uniform (dense at large sizes), to place the spread and
+coverage thresholds between the estimates of those workloads.
+"""
+
+import argparse
+import sys
+import timeit
+
+from quadtree.broadphase import Broadphase, METHODS, DEFAULTS, estimate
+from benchmark.workloads import generate
+
+def timings(workload, n, repeat=3, seed=0):
+    """Return dictionary of best time taken by each method on n circles of workload."""
+    _, circles, _ = generate(workload, n, seed)
+    circles = list({(c[0], c[1], c[2]) : c for c in circles}.values())
+    return {name: min(timeit.Timer(lambda: list(method(circles))).repeat(repeat, 1))
+            for name, method in METHODS.items()}
+
+def between(low, high):
+    """Return threshold separating estimates low and high of two workloads."""
+    return (low * high) ** 0.5
+
+def calibrate(largest=2048, repeat=3, seed=0, report=None):
+    """Return thresholds measured on this machine, calling report with each timing."""
+    thresholds = dict(DEFAULTS)
+
+    # Sizes for which naive, then columnar, remain fastest
+    naive = columnar = 0
+    naiveFastest = columnarFastest = True
+    n = 8
+    while n <= largest:
+        times = timings('sparse', n, repeat, seed)
+        if report:
+            report('sparse', n, times)
+        tree = min(times['grid'], times['quadtree'])
+        naiveFastest = naiveFastest and times['naive'] <= min(times['columnar'], tree)
+        columnarFastest = columnarFastest and min(times['naive'], times['columnar']) <= tree
+        if naiveFastest:
+            naive = n
+        if columnarFastest:
+            columnar = n
+        n *= 2
+    thresholds['naive'] = naive
+    thresholds['columnar'] = max(naive, columnar)
+
+    # Spread: grid suits sparse, while quadtree should suit powerlaw
+    sparse = timings('sparse', largest, repeat, seed)
+    powerlaw = timings('powerlaw', largest, repeat, seed)
+    uniform = timings('uniform', largest, repeat, seed)
+    if report:
+        report('powerlaw', largest, powerlaw)
+        report('uniform', largest, uniform)
+
+    _, circles, _ = generate('sparse', largest, seed)
+    sparseSpread, sparseCoverage = estimate(circles)
+    _, circles, _ = generate('powerlaw', largest, seed)
+    powerlawSpread, _ = estimate(circles)
+    _, circles, _ = generate('uniform', largest, seed)
+    _, uniformCoverage = estimate(circles)
+
+    if sparse['grid'] <= sparse['quadtree'] and powerlaw['quadtree'] < powerlaw['grid']:
+        thresholds['spread'] = between(sparseSpread, powerlawSpread)
+    elif sparse['quadtree'] < sparse['grid']:
+        thresholds['spread'] = 0.0
+    else:
+        thresholds['spread'] = max(DEFAULTS['spread'], 2 * powerlawSpread)
+
+    # Coverage: trees suit sparse, while columnar should suit dense uniform
+    if (min(sparse['grid'], sparse['quadtree']) <= sparse['columnar'] and 
+        uniform['columnar'] < min(uniform['grid'], uniform['quadtree'])):
+        thresholds['coverage'] = between(sparseCoverage, uniformCoverage)
+    return thresholds
+
+def main(args=None):
+    """Calibrate thresholds as directed by command line args, and save them."""
+    parser = argparse.ArgumentParser(prog='python -m benchmark.calibrate', description='Calibrate broadphase.')
+    parser.add_argument('--largest', type=int, default=2048, help='largest number of circles timed')
+    parser.add_argument('--repeat', type=int, default=3, help='measurements of each method')
+    parser.add_argument('--seed', type=int, default=0, help='seed for generating workloads')
+    parser.add_argument('--output', default='broadphase.json', help='JSON file to hold thresholds')
+    options = parser.parse_args(args)
+
+    print ('workload', 'n', *("%s(ms)" % name for name in METHODS))
+    def report(workload, n, times):
+        print (workload, n, *("%5.3f" % (1000*times[name]) for name in METHODS))
+        sys.stdout.flush()
+
+    planner = Broadphase(calibrate(options.largest, options.repeat, options.seed, report))
+    planner.save(options.output)
+    print ('thresholds', planner.thresholds)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
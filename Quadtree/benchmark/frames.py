@@ -0,0 +1,197 @@
+"""
+Headless replay of the simulation loop of the moving circle applications, run
+from the command line with
+
+    python -m benchmark.frames --sizes 1000 10000 --frames 200
+
+Each frame advances every circle by its velocity, bouncing off the sides of the
+region as QuadTreeMovingApp.updateLocations does, then brings the tree up to date
+and marks every colliding pair. These three phases (integrate, maintain and
+collide) are timed separately, and p50/p99 frame times are reported for each
+strategy of maintaining the tree: rebuilding it every frame, or moving circles
+within it.
+"""
+
+import argparse
+import json
+import sys
+import time
+
+from adk.region import X, Y
+from quadtree.quad import QuadTree
+from quadtree.util import RADIUS, HIT, DX, DY, defaultCollision
+from benchmark.harness import select
+from benchmark.workloads import WORKLOADS, generate
+
+def integrate(circles, region):
+    """
+    Advance each circle by its velocity, reversing velocity instead when circle would
+    reach a side of region. Returns list of (circle, x, y) with the new locations.
+    """
+    moves = []
+    for c in circles:
+        c[HIT] = False
+
+        x = c[X]
+        if c[X] - c[RADIUS] + c[DX] <= region.x_min or c[X] + c[RADIUS] + c[DX] >= region.x_max:
+            c[DX] = -c[DX]
+        else:
+            x = c[X] + c[DX]
+
+        y = c[Y]
+        if c[Y] - c[RADIUS] + c[DY] <= region.y_min or c[Y] + c[RADIUS] + c[DY] >= region.y_max:
+            c[DY] = -c[DY]
+        else:
+            y = c[Y] + c[DY]
+        moves.append((c, x, y))
+    return moves
+
+class Naive:
+    """Check every pair of circles, without any tree."""
+
+    def __init__(self, region, circles):
+        self.circles = circles
+
+    def maintain(self, moves):
+        for c, x, y in moves:
+            c[X] = x
+            c[Y] = y
+
+    def collide(self):
+        circles = self.circles
+        for i in range(len(circles)):
+            for j in range(i+1, len(circles)):
+                if defaultCollision(circles[i], circles[j]):
+                    yield (circles[i], circles[j])
+
+class Rebuild(Naive):
+    """Construct new QuadTree from all circles every frame."""
+
+    def __init__(self, region, circles, looseness=1):
+        Naive.__init__(self, region, circles)
+        self.region = region
+        self.looseness = looseness
+
+    def maintain(self, moves):
+        Naive.maintain(self, moves)
+        self.tree = QuadTree.fromCircles(self.region, self.circles, looseness=self.looseness)
+
+    def collide(self):
+        return self.tree.allPairs()
+
+class Incremental:
+    """
+    Keep one QuadTree, using update() to relocate circles that leave their node. A
+    circle which lands exactly on another cannot be held by the tree, so it is set
+    aside and added again once its location is free, just as a rebuilt tree would.
+    """
+
+    def __init__(self, region, circles, looseness=1):
+        self.tree = QuadTree.fromCircles(region, circles, looseness=looseness)
+        held = {id(c) for c in self.tree}
+        self.outside = [c for c in circles if id(c) not in held]
+
+    def maintain(self, moves):
+        outside = {id(c) for c in self.outside}
+        self.outside = self.tree.update([m for m in moves if id(m[0]) not in outside])
+        for c, x, y in moves:
+            if id(c) in outside:
+                c[X] = x
+                c[Y] = y
+                if not self.tree.add(c):
+                    self.outside.append(c)
+
+    def collide(self):
+        return self.tree.allPairs()
+
+# Each strategy, with largest number of circles for which it is run (None for no limit)
+STRATEGIES = {
+    'naive'         : (Naive, 4096),
+    'rebuild'       : (Rebuild, None),
+    'rebuild.loose' : (lambda region, circles: Rebuild(region, circles, 2), None),
+    'move'          : (Incremental, None),
+    'move.loose'    : (lambda region, circles: Incremental(region, circles, 2), None),
+}
+
+def percentile(values, q):
+    """Return value at fraction q (nearest rank) of values."""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+def replay(strategy, workload, n, frames, seed=0):
+    """
+    Replay frames of n circles from workload using strategy. Returns dictionary with
+    p50/p99 seconds of each phase and of whole frames, and the colliding pairs and
+    the circles held by the tree (or checked by naive) in the last frame.
+    """
+    region, circles, _ = generate(workload, n, seed)
+    scene = STRATEGIES[strategy][0](region, circles)
+
+    phases = {'integrate': [], 'maintain': [], 'collide': [], 'frame': []}
+    pairs = 0
+    for _ in range(frames):
+        start = time.perf_counter()
+        moves = integrate(circles, region)
+        integrated = time.perf_counter()
+        scene.maintain(moves)
+        maintained = time.perf_counter()
+        pairs = 0
+        for c1, c2 in scene.collide():
+            c1[HIT] = True
+            c2[HIT] = True
+            pairs += 1
+        end = time.perf_counter()
+
+        phases['integrate'].append(integrated - start)
+        phases['maintain'].append(maintained - integrated)
+        phases['collide'].append(end - maintained)
+        phases['frame'].append(end - start)
+
+    remaining = len(scene.tree) if hasattr(scene, 'tree') else len(circles)
+    return {'strategy': strategy, 'workload': workload, 'n': n, 'frames': frames, 'seed': seed,
+            'pairs': pairs, 'circles': remaining,
+            'phases': {name: {'p50': percentile(times, 0.5), 'p99': percentile(times, 0.99)}
+                       for name, times in phases.items()}}
+
+def run(strategies=None, workloads=None, sizes=(1000,), frames=100, seed=0, report=None):
+    """Replay every selected strategy and workload (glob patterns) at each size."""
+    results = []
+    for workload in select(WORKLOADS, workloads):
+        for n in sizes:
+            for strategy in select(STRATEGIES, strategies):
+                limit = STRATEGIES[strategy][1]
+                if limit is not None and n > limit:
+                    continue
+                result = replay(strategy, workload, n, frames, seed)
+                if report:
+                    report(result)
+                results.append(result)
+    return {'results': results}
+
+def main(args=None):
+    """Replay frames as directed by command line args."""
+    parser = argparse.ArgumentParser(prog='python -m benchmark.frames', description='Time simulation frames.')
+    parser.add_argument('--strategy', nargs='*', help='glob patterns selecting strategies (default all)')
+    parser.add_argument('--workload', nargs='*', default=['moving'], help='glob patterns selecting workloads')
+    parser.add_argument('--sizes', nargs='+', type=int, default=[1000, 10000], help='numbers of circles')
+    parser.add_argument('--frames', type=int, default=100, help='frames to replay')
+    parser.add_argument('--seed', type=int, default=0, help='seed for generating workloads')
+    parser.add_argument('--output', help='write results to this JSON file')
+    options = parser.parse_args(args)
+
+    print ('strategy', 'workload', 'n', 'integrate p50/p99(ms)', 'maintain p50/p99(ms)',
+           'collide p50/p99(ms)', 'frame p50/p99(ms)')
+    def report(result):
+        times = ["%5.3f/%5.3f" % (1000*result['phases'][p]['p50'], 1000*result['phases'][p]['p99'])
+                 for p in ('integrate', 'maintain', 'collide', 'frame')]
+        print (result['strategy'], result['workload'], result['n'], *times)
+        sys.stdout.flush()
+
+    document = run(options.strategy, options.workload, options.sizes, options.frames, options.seed, report)
+    if options.output:
+        with open(options.output, 'w') as f:
+            json.dump(document, f, indent=1)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
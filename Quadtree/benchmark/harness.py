@@ -0,0 +1,191 @@
+"""
+Time benchmark cases over workloads, and compare results against a baseline.
+
+A case is a function taking (region, circles, targets) that performs any setup
+and returns the zero-argument function to be timed. Nothing is compiled from
+strings, so setup is done once per measurement and sizes are only limited by
+how long the case takes: the naive cases are skipped beyond their limit.
+"""
+
+import fnmatch
+import json
+import platform
+import statistics
+import timeit
+
+from adk.region import X, Y
+from quadtree import quad, quad_point, quad_region
+from quadtree.util import defaultCollision
+from benchmark.workloads import WORKLOADS, generate
+
+FORMAT = 1
+
+def naivePairs(region, circles, targets):
+    """Check every pair of circles."""
+    def run():
+        collisions = []
+        for i in range(len(circles)):
+            for j in range(i+1, len(circles)):
+                if defaultCollision(circles[i], circles[j]):
+                    collisions.append((circles[i], circles[j]))
+        return collisions
+    return run
+
+def naiveCollide(region, circles, targets):
+    """Check every target against every circle."""
+    def run():
+        collisions = []
+        for target in targets:
+            for circle in circles:
+                if defaultCollision(target, circle):
+                    collisions.append((target, circle))
+        return collisions
+    return run
+
+def quadBuild(region, circles, targets):
+    """Construct QuadTree in one pass."""
+    return lambda: quad.QuadTree.fromCircles(region, circles)
+
+def quadAdd(region, circles, targets):
+    """Construct QuadTree by adding each circle."""
+    def run():
+        qt = quad.QuadTree(region)
+        for circle in circles:
+            qt.add(circle)
+        return qt
+    return run
+
+def quadCollide(region, circles, targets):
+    """Collide each target against prebuilt QuadTree."""
+    qt = quad.QuadTree.fromCircles(region, circles)
+    def run():
+        collisions = []
+        for target in targets:
+            for circle in qt.collide(target):
+                collisions.append((target, circle))
+        return collisions
+    return run
+
+def quadAllPairs(region, circles, targets):
+    """Find all colliding pairs in prebuilt QuadTree."""
+    qt = quad.QuadTree.fromCircles(region, circles)
+    return lambda: list(qt.allPairs())
+
+def points(circles):
+    """Centers of circles, as integer points."""
+    return [(int(c[X]), int(c[Y])) for c in circles]
+
+def pointBuild(region, circles, targets):
+    """Construct point QuadTree from centers of circles."""
+    pts = points(circles)
+    def run():
+        qt = quad_point.QuadTree(region)
+        for pt in pts:
+            qt.add(pt)
+        return qt
+    return run
+
+def pointContains(region, circles, targets):
+    """Look up centers of targets in prebuilt point QuadTree."""
+    qt = pointBuild(region, circles, targets)()
+    pts = points(targets)
+    return lambda: [pt in qt for pt in pts]
+
+def regionBuild(region, circles, targets):
+    """Construct region QuadTree from centers of circles."""
+    pts = points(circles)
+    def run():
+        qt = quad_region.QuadTree(region)
+        for pt in pts:
+            qt.add(pt)
+        return qt
+    return run
+
+def regionContains(region, circles, targets):
+    """Look up centers of targets in prebuilt region QuadTree."""
+    qt = regionBuild(region, circles, targets)()
+    pts = points(targets)
+    return lambda: [pt in qt for pt in pts]
+
+# Each case, with largest number of circles for which it is run (None for no limit)
+CASES = {
+    'naive.pairs'         : (naivePairs, 4096),
+    'naive.collide'       : (naiveCollide, 16384),
+    'quad.build'          : (quadBuild, None),
+    'quad.add'            : (quadAdd, None),
+    'quad.collide'        : (quadCollide, None),
+    'quad.allPairs'       : (quadAllPairs, None),
+    'quad_point.build'    : (pointBuild, None),
+    'quad_point.contains' : (pointContains, None),
+    'quad_region.build'   : (regionBuild, None),
+    'quad_region.contains': (regionContains, None),
+}
+
+def select(names, patterns):
+    """Return names matching any of the glob patterns, in their original order."""
+    if not patterns:
+        return list(names)
+    return [name for name in names if any(fnmatch.fnmatch(name, p) for p in patterns)]
+
+def measure(case, workload, n, repeat=5, seed=0, targets=1000):
+    """
+    Time case over n circles of workload, with the given number of targets. Each
+    of the repeat measurements runs the case once; returns a result dictionary
+    with the best and median times in seconds.
+    """
+    region, circles, batch = generate(workload, n, seed, targets)
+    prepare = CASES[case][0]
+    times = timeit.Timer(prepare(region, circles, batch)).repeat(repeat, 1)
+    return {'case': case, 'workload': workload, 'n': n, 'targets': len(batch), 'seed': seed,
+            'best': min(times), 'median': statistics.median(times)}
+
+def run(cases=None, workloads=None, sizes=(1000,), repeat=5, seed=0, targets=1000, report=None):
+    """
+    Measure every selected case (glob patterns) over every selected workload and
+    size, skipping sizes beyond the limit of a case. When given, report is called
+    with each result as it completes. Returns document ready to be saved as JSON.
+    """
+    results = []
+    for workload in select(WORKLOADS, workloads):
+        for n in sizes:
+            for case in select(CASES, cases):
+                limit = CASES[case][1]
+                if limit is not None and n > limit:
+                    continue
+                result = measure(case, workload, n, repeat, seed, targets)
+                if report:
+                    report(result)
+                results.append(result)
+
+    return {'format': FORMAT, 'python': platform.python_version(), 'platform': platform.platform(),
+            'repeat': repeat, 'results': results}
+
+def key(result):
+    """Identify the measurement made by result."""
+    return (result['case'], result['workload'], result['n'], result['targets'], result['seed'])
+
+def compare(document, baseline, tolerance=0.1):
+    """
+    Return list of (result, base) pairs for those results whose best time exceeds
+    that of the same measurement in baseline by more than the tolerance fraction.
+    """
+    if baseline.get('format') != FORMAT:
+        raise ValueError("baseline has format {}, expected {}".format(baseline.get('format'), FORMAT))
+
+    previous = {key(base): base for base in baseline['results']}
+    regressions = []
+    for result in document['results']:
+        base = previous.get(key(result))
+        if base is not None and result['best'] > base['best'] * (1 + tolerance):
+            regressions.append((result, base))
+    return regressions
+
+def save(document, path):
+    """Write document of results to path as JSON."""
+    with open(path, 'w') as f:
+        json.dump(document, f, indent=1)
+
+def load(path):
+    """Read document of results from JSON file at path."""
+    with open(path) as f:
+        return json.load(f)
@@ -0,0 +1,118 @@
+"""
+Named workloads of circles for benchmarks and tests. Each workload is a function
+taking the number of circles and a random.Random, and returning (region, circles),
+where each circle is [x, y, radius, False, False, dx, dy]. Velocity (dx, dy) is
+zero except for the moving workload. Centers always lie within region.
+
+Besides the uniform distribution used throughout performance/, these model skewed
+scenes: clusters, hotspots of coincident centers, a few very large circles among
+many small ones, centers aligned with the boundaries of quadtree nodes, and long
+thin corridors. Same seed always produces the same circles.
+"""
+
+import math
+import random
+
+from adk.region import Region
+
+def side(n):
+    """Side of square region in which n circles have density of 256 circles in 512x512."""
+    return max(512, int(32 * math.sqrt(n)))
+
+def clamp(value, size):
+    """Restrict value to [0, size-1]."""
+    return min(max(value, 0), size - 1)
+
+def uniform(n, rng):
+    """Centers uniform over a fixed 512x512 region with radii from 4 to 10, as in performance/."""
+    circles = [[rng.randint(0,511), rng.randint(0,511), rng.randint(4,10), False, False, 0, 0] for _ in range(n)]
+    return (Region(0,0,512,512), circles)
+
+def sparse(n, rng):
+    """Same as uniform, but region grows with n so density stays that of 256 circles in 512x512."""
+    s = side(n)
+    circles = [[rng.randint(0,s-1), rng.randint(0,s-1), rng.randint(4,10), False, False, 0, 0] for _ in range(n)]
+    return (Region(0,0,s,s), circles)
+
+def clustered(n, rng):
+    """Centers drawn from Gaussian clusters of about 200 circles each."""
+    s = side(n)
+    centers = [(rng.uniform(0,s), rng.uniform(0,s)) for _ in range(max(1, n // 200))]
+    sigma = s / 40
+    circles = []
+    for _ in range(n):
+        cx, cy = rng.choice(centers)
+        circles.append([clamp(round(rng.gauss(cx, sigma)), s), clamp(round(rng.gauss(cy, sigma)), s),
+                        rng.randint(4,10), False, False, 0, 0])
+    return (Region(0,0,s,s), circles)
+
+def powerlaw(n, rng):
+    """Uniform centers whose radii follow a power law, so a few circles are very large."""
+    s = side(n)
+    circles = [[rng.randint(0,s-1), rng.randint(0,s-1), min(s // 4, round(4 * rng.paretovariate(1.5))),
+                False, False, 0, 0] for _ in range(n)]
+    return (Region(0,0,s,s), circles)
+
+def grid(n, rng):
+    """Centers on a lattice of spacing 32, which lie on the boundaries between quadtree nodes."""
+    s = side(n)
+    lattice = s // 32
+    circles = [[32 * rng.randrange(lattice), 32 * rng.randrange(lattice), rng.uniform(4,10),
+                False, False, 0, 0] for _ in range(n)]
+    return (Region(0,0,s,s), circles)
+
+def coincident(n, rng):
+    """Half the circles share one of a few hotspot centers, differing only in radius."""
+    s = side(n)
+    hotspots = [(rng.randint(0,s-1), rng.randint(0,s-1)) for _ in range(8)]
+    circles = []
+    for i in range(n):
+        if i % 2:
+            x, y = rng.choice(hotspots)
+        else:
+            x, y = rng.randint(0,s-1), rng.randint(0,s-1)
+        circles.append([x, y, rng.uniform(4,10), False, False, 0, 0])
+    return (Region(0,0,s,s), circles)
+
+def corridor(n, rng):
+    """Centers packed into a few long thin horizontal and vertical corridors."""
+    s = side(n)
+    corridors = [(rng.random() < 0.5, rng.randint(16, s-17)) for _ in range(4)]
+    circles = []
+    for _ in range(n):
+        horizontal, at = rng.choice(corridors)
+        along = rng.randint(0, s-1)
+        across = clamp(at + rng.randint(-16, 16), s)
+        x, y = (along, across) if horizontal else (across, along)
+        circles.append([x, y, rng.randint(2,6), False, False, 0, 0])
+    return (Region(0,0,s,s), circles)
+
+def moving(n, rng):
+    """Uniform scene whose circles each have a non-zero velocity (dx, dy) of at most 3."""
+    s = side(n)
+    circles = []
+    for _ in range(n):
+        dx = dy = 0
+        while dx == 0 and dy == 0:
+            dx, dy = rng.randint(-3,3), rng.randint(-3,3)
+        circles.append([rng.randint(0,s-1), rng.randint(0,s-1), rng.randint(4,10), False, False, dx, dy])
+    return (Region(0,0,s,s), circles)
+
+WORKLOADS = {
+    'uniform'    : uniform,
+    'sparse'     : sparse,
+    'clustered'  : clustered,
+    'powerlaw'   : powerlaw,
+    'grid'       : grid,
+    'coincident' : coincident,
+    'corridor'   : corridor,
+    'moving'     : moving,
+}
+
+def generate(name, n, seed=0, targets=0):
+    """
+    Return (region, circles, targets) for named workload with n circles and the
+    given number of target circles, drawn from the same distribution.
+    """
+    region, circles = WORKLOADS[name](n + targets, random.Random(seed))
+    return (region, circles[:n], circles[n:])
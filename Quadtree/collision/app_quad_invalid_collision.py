@@ -18,7 +18,7 @@ from tkinter import Tk, Canvas, ALL
 
 from adk.region import Region, minValue, maxValue, X, Y
 from quadtree.quad_point import QuadTree
-from quadtree.util import defaultCollision, RADIUS, HIT
+from quadtree.util import defaultCollision, RADIUS, HIT, preorder
 
 # All circles have radius of 10 pixels
 Radius = 10
@@ -88,32 +88,27 @@ class QuadTreeInvalidApp:
         self.visit(self.tree.root)
 
     def visit (self, node):
-        """Visit nodes recursively."""
-        if node == None: 
-            return
-
-        # draw rectangular region with criss-crossed hashed lines 
-        r = node.region
-        self.canvas.create_rectangle(r.x_min, self.toTk(r.y_min), 
-                                     r.x_max, self.toTk(r.y_max))
+        """Visit nodes in pre-order."""
+        for node in preorder(node):
+            # draw rectangular region with criss-crossed hashed lines 
+            r = node.region
+            self.canvas.create_rectangle(r.x_min, self.toTk(r.y_min), 
+                                         r.x_max, self.toTk(r.y_max))
          
-        self.canvas.create_line(r.x_min, self.toTk(node.origin[Y]), 
-                                r.x_max, self.toTk(node.origin[Y]),
-                                dash=(2, 4)) 
-        self.canvas.create_line(node.origin[X], self.toTk(r.y_min), 
-                                node.origin[X], self.toTk(r.y_max),
-                                dash=(2, 4))
-        
-        if node.points: 
-            for circle in node.points:
-                markColor = 'black'
-                if circle[HIT]: markColor = 'red'
-                self.canvas.create_oval(circle[X] - circle[RADIUS], self.toTk(circle[Y]) - circle[RADIUS], 
-                                        circle[X] + circle[RADIUS], self.toTk(circle[Y]) + circle[RADIUS], 
-                                        fill=markColor)
+            self.canvas.create_line(r.x_min, self.toTk(node.origin[Y]), 
+                                    r.x_max, self.toTk(node.origin[Y]),
+                                    dash=(2, 4)) 
+            self.canvas.create_line(node.origin[X], self.toTk(r.y_min), 
+                                    node.origin[X], self.toTk(r.y_max),
+                                    dash=(2, 4))
         
-        for n in node.children:
-            self.visit(n)
+            if node.points: 
+                for circle in node.points:
+                    markColor = 'black'
+                    if circle[HIT]: markColor = 'red'
+                    self.canvas.create_oval(circle[X] - circle[RADIUS], self.toTk(circle[Y]) - circle[RADIUS], 
+                                            circle[X] + circle[RADIUS], self.toTk(circle[Y]) + circle[RADIUS], 
+                                            fill=markColor)
             
 if __name__ == '__main__':
     root = Tk()
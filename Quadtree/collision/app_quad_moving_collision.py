@@ -11,7 +11,7 @@ from tkinter import Tk, Canvas, ALL
 
 from adk.region import Region, minValue, maxValue, X, Y
 from quadtree.quad import QuadTree
-from quadtree.util import RADIUS, MULTIPLE, HIT, DX, DY
+from quadtree.util import RADIUS, MULTIPLE, HIT, DX, DY, preorder
 
 # Frequency (in ms) of screen refresh
 frameDelay = 40
@@ -65,64 +65,60 @@ class QuadTreeMovingApp:
 
     def visit (self, node):
         """Visit node to paint properly."""
-        if node == None: return
-
-        # draw rectangular region and hashed cross-hairs
-        r = node.region
-        self.canvas.create_rectangle(r.x_min, self.toTk(r.y_min), r.x_max, self.toTk(r.y_max))
+        for node in preorder(node):
+            # draw rectangular region and hashed cross-hairs
+            r = node.region
+            self.canvas.create_rectangle(r.x_min, self.toTk(r.y_min), r.x_max, self.toTk(r.y_max))
         
-        self.canvas.create_line(r.x_min, self.toTk(node.origin[Y]), r.x_max, self.toTk(node.origin[Y]),
-                                dash=(2, 4)) 
-        self.canvas.create_line(node.origin[X], self.toTk(r.y_min), node.origin[X], self.toTk(r.y_max),
-                                dash=(2, 4))
+            self.canvas.create_line(r.x_min, self.toTk(node.origin[Y]), r.x_max, self.toTk(node.origin[Y]),
+                                    dash=(2, 4)) 
+            self.canvas.create_line(node.origin[X], self.toTk(r.y_min), node.origin[X], self.toTk(r.y_max),
+                                    dash=(2, 4))
         
-        # Draw each circle, colored appropriately
-        for circle in node.circles:
-            markColor = 'black'
-            if circle[MULTIPLE]: markColor = 'blue'
-            if circle[HIT]: markColor = 'red'
-            self.canvas.create_oval(circle[X] - circle[RADIUS], self.toTk(circle[Y]) - circle[RADIUS], 
-                                 circle[X] + circle[RADIUS], self.toTk(circle[Y]) + circle[RADIUS], 
-                                 fill=markColor)
-            
-        for n in node.children:
-            self.visit(n)
+            # Draw each circle, colored appropriately
+            for circle in node.circles:
+                markColor = 'black'
+                if circle[MULTIPLE]: markColor = 'blue'
+                if circle[HIT]: markColor = 'red'
+                self.canvas.create_oval(circle[X] - circle[RADIUS], self.toTk(circle[Y]) - circle[RADIUS], 
+                                     circle[X] + circle[RADIUS], self.toTk(circle[Y]) + circle[RADIUS], 
+                                     fill=markColor)
         
     def updateLocations(self):
-        """Move all circles, reconstruct QuadTree and repaint."""
+        """Move all circles within QuadTree and repaint."""
         self.master.after(frameDelay, self.updateLocations)
 
         if self.tree.root is None: return
         
-        # Destroy tree each time and reinsert all circles
-        nodes = self.tree.root.preorder()
-        self.tree = QuadTree(Region(0,0,512,512))
-        for n in nodes:
-            if n.circles is None: 
-                continue
+        # Move all circles within tree, which only relocates circles that leave 
+        # their node.
+        moves = []
+        for c in list(self.tree):
+            c[HIT] = False
             
-            for c in n.circles:
-                c[HIT] = False
+            x = c[X]
+            if c[X] - c[RADIUS] + c[DX] <= self.tree.region.x_min:
+                c[DX] = -c[DX]
+            elif c[X] + c[RADIUS] + c[DX] >= self.tree.region.x_max:
+                c[DX] = -c[DX]
+            else:
+                x = c[X] + c[DX]
                 
-                if c[X] - c[RADIUS] + c[DX] <= self.tree.region.x_min:
-                    c[DX] = -c[DX]
-                elif c[X] + c[RADIUS] + c[DX] >= self.tree.region.x_max:
-                    c[DX] = -c[DX]
-                else:
-                    c[X] = c[X] + c[DX]
-                    
-                if c[Y] - c[RADIUS] + c[DY] <= self.tree.region.y_min:
-                    c[DY] = -c[DY]
-                elif c[Y] + c[RADIUS] + c[DY] >= self.tree.region.y_max:
-                    c[DY] = -c[DY]
-                else:
-                    c[Y] = c[Y] + c[DY]
-                    
-                # Update hit status for all colliding circles and insert
-                for circ in self.tree.collide(c):
-                    circ[HIT] = True
-                    c[HIT] = True
-                self.tree.add(c)
+            y = c[Y]
+            if c[Y] - c[RADIUS] + c[DY] <= self.tree.region.y_min:
+                c[DY] = -c[DY]
+            elif c[Y] + c[RADIUS] + c[DY] >= self.tree.region.y_max:
+                c[DY] = -c[DY]
+            else:
+                y = c[Y] + c[DY]
+            
+            moves.append((c, x, y))
+        self.tree.update(moves)
+            
+        # Update hit status for all colliding circles
+        for c1, c2 in self.tree.allPairs():
+            c1[HIT] = True
+            c2[HIT] = True
                 
         self.canvas.delete(ALL)
         self.visit(self.tree.root)
@@ -0,0 +1,84 @@
+import random
+import tracemalloc
+
+from adk.region import Region
+from quadtree import quad, quad_point, quad_region, quad0
+from quadtree.util import preorder
+
+def countNodes(node):
+    """Count nodes in subtree rooted at node."""
+    if node is None:
+        return 0
+    total = 1
+    for child in node.children:
+        total += countNodes(child)
+    return total
+
+def measure(build, items):
+    """
+    Return (nodes, bytes per node, memoryUsage() bytes per node, items per full node)
+    for tree constructed by build from items. The last is None unless tree is a
+    quad_region QuadTree, where it measures how well full nodes compress points.
+    """
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    qt = build(items)
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    nodes = countNodes(qt.root)
+    compression = None
+    if isinstance(qt, quad_region.QuadTree):
+        full = sum(1 for node in preorder(qt.root) if node.full)
+        compression = len(set(items)) / max(1, full)
+    return (nodes, (after - before) / nodes, qt.memoryUsage()['total'] / nodes, compression)
+
+def buildCircles(circles):
+    qt = quad.QuadTree(Region(0,0,4096,4096))
+    for circle in circles:
+        qt.add(circle)
+    return qt
+
+def buildColumnar(circles):
+    qt = quad.QuadTree(Region(0,0,4096,4096), columnar=True)
+    for circle in circles:
+        qt.add(circle)
+    return qt
+
+def buildPoints(points):
+    qt = quad_point.QuadTree(Region(0,0,4096,4096))
+    for pt in points:
+        qt.add(pt)
+    return qt
+
+def buildRegion(points):
+    qt = quad_region.QuadTree(Region(0,0,4096,4096))
+    for pt in points:
+        qt.add(pt)
+    return qt
+
+def buildQuad0(points):
+    qt = quad0.QuadTree(Region(0,0,4096,4096))
+    for pt in points:
+        qt.add(pt)
+    return qt
+
+def performance():
+    """
+    Report memory used by each node of each kind of quadtree, both as traced while
+    constructing it and as accounted by its memoryUsage().
+    """
+    n = 20000
+    random.seed(0)
+    circles = [[random.randint(0,4096), random.randint(0,4096), random.randint(1,8), False, False] for _ in range(n)]
+    points = [(random.randint(0,4095), random.randint(0,4095)) for _ in range(n)]
+    
+    print ('Tree', 'Nodes', 'Bytes/Node', 'Usage/Node', 'Points/FullNode')
+    for name, build, items in [('quad', buildCircles, circles), ('quad.columnar', buildColumnar, circles),
+                               ('quad_point', buildPoints, points), ('quad_region', buildRegion, points),
+                               ('quad0', buildQuad0, points)]:
+        nodes, perNode, usage, compression = measure(build, items)
+        print ("%s %d %5.1f %5.1f %s" % (name, nodes, perNode, usage,
+                                         '-' if compression is None else '%5.2f' % compression))
+
+if __name__ == '__main__':
+    performance()
@@ -2,8 +2,39 @@
 import random
 import timeit
 
+from quadtree.quad import QuadTree
+from quadtree.util import defaultCollision
+from adk.region import Region
+
 # Uncomment the print ("numCol:" + str(len(collisions))) statements to confirm
-# the number of collisions is the same
+# the number of collisions is the same. See the benchmark package for larger runs.
+
+def naive(circles):
+    """Check every pair of circles."""
+    collisions = []
+    for i in range(len(circles)):
+        for j in range(i+1, len(circles)):
+            if defaultCollision(circles[i], circles[j]):
+                collisions.append([circles[i], circles[j]])
+    #print ("numCol:" + str(len(collisions)))
+
+def incremental(circles):
+    """Collide each circle with those before it, then add it to QuadTree."""
+    collisions = []
+    qt = QuadTree(Region(0,0,512,512))
+    for circle in circles:
+        for s in qt.collide(circle):
+            collisions.append([circle, s])
+        qt.add(circle)
+    #print ("numCol:" + str(len(collisions)))
+
+def allPairs(circles):
+    """Build QuadTree in one pass, then find all colliding pairs in single traversal."""
+    collisions = []
+    qt = QuadTree.fromCircles(Region(0,0,512,512), circles)
+    for pair in qt.allPairs():
+        collisions.append(pair)
+    #print ("numCol:" + str(len(collisions)))
 
 def performance():
     """Demonstrate execution performance."""
@@ -12,57 +43,33 @@ def performance():
     
     maxRadius = 10
      
-    print ('n', 'Naive Time', 'Quadtree Time')
+    print ('n', 'Naive Time', 'Quadtree Time', 'AllPairs Time', 'Pruning')
     while n <= 1024:
-        naive_total = quadtree_total = 0
-        
         circles = []
         for _ in range(n):
             circle = [random.randint(0,512), random.randint(0,512), random.randint(4, maxRadius), False, False, 0, 0]
             circles.append (circle)
-            
-        setup='''
-from quadtree.quad import QuadTree
-from adk.region import Region
-circles = []'''
+        
+        naive_total = min(timeit.Timer(lambda: naive(circles)).repeat(5,numTrials))
+        quadtree_total = min(timeit.Timer(lambda: incremental(circles)).repeat(5,numTrials))
+        allpairs_total = min(timeit.Timer(lambda: allPairs(circles)).repeat(5,numTrials))
+        
+        # Fraction of circles each collide() avoided checking, outside of timing
+        qt = QuadTree.fromCircles(Region(0,0,512,512), circles)
+        qt.instrument()
         for circle in circles:
-            setup = setup + "\ncircles.append([%d,%d,%d,%d,False,False,0,0])" % (circle[0], circle[1], circle[2], circle[3])
-        setup = setup + "\nqt = QuadTree(Region(0,0,512,512))"
-
-        naive_total += min(timeit.Timer(
-'''
-from quadtree.quad import defaultCollision
-collisions = []
-for i in range(len(circles)):
-    for j in range(i+1, len(circles)):
-         if defaultCollision(circles[i], circles[j]):
-             collisions.append([circles[i], circles[j]])
-#print ("numCol:" + str(len(collisions)))
-'''
-                                        , setup=setup).repeat(5,numTrials))
-           
-        quadtree_total += min(timeit.Timer(
-'''
-from quadtree.quad import defaultCollision
-collisions = []
-qt = QuadTree(Region(0,0,512,512))
-
-for circle in circles:
-    for s in qt.collide(circle):
-        collisions.append([circle, s])
-    qt.add(circle)
-#print ("numCol:" + str(len(collisions)))
-'''
-                                        , setup=setup).repeat(5,numTrials))
+            for _ in qt.collide(circle):
+                pass
+        pruning = qt.stats()['pruning']
             
-        print ("%d %5.4f %5.4f" % (n, 1000*naive_total/numTrials, 1000*quadtree_total/numTrials))
+        print ("%d %5.4f %5.4f %5.4f %5.3f" % (n, 1000*naive_total/numTrials, 1000*quadtree_total/numTrials, 1000*allpairs_total/numTrials, pruning))
 
         n *= 2
 
 if __name__ == '__main__':
     performance()
         
-# Sample Run:
+# Sample Run (original, before allPairs):
 """
 n Naive Time QuadTree Time
 16 0.4351 0.6823
@@ -72,4 +79,28 @@ n Naive Time QuadTree Time
 256 52.5854 34.9976
 512 212.1106 119.8405
 1024 852.0942 462.7938
+"""
+
+# Sample Run (with allPairs):
+"""
+n Naive Time Quadtree Time AllPairs Time
+16 0.0515 0.2607 0.1662
+32 0.2225 0.7545 0.2366
+64 0.5134 1.5303 1.1204
+128 3.8368 5.0731 2.5805
+256 8.2504 9.9527 6.1723
+512 37.1262 18.5843 7.6736
+1024 189.4316 63.3981 31.5432
+"""
+
+# Sample Run (with pruning of collide):
+"""
+n Naive Time Quadtree Time AllPairs Time Pruning
+16 0.0539 0.3159 0.0854 0.750
+32 0.1265 0.3459 0.1766 0.832
+64 0.5260 0.8961 0.4860 0.833
+128 3.3071 2.9311 0.9808 0.864
+256 12.7386 6.9530 2.2404 0.874
+512 51.8872 13.9023 6.8807 0.881
+1024 226.6176 36.2822 17.6093 0.893
 """
\ No newline at end of file
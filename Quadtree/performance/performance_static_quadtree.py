@@ -1,6 +1,30 @@
 import random
 import timeit
 
+from quadtree.quad import QuadTree
+from quadtree.util import defaultCollision
+from adk.region import Region
+
+# Uncomment the print ("numCol:" + str(len(collisions))) statements to confirm
+# the number of collisions is the same. See the benchmark package for larger runs.
+
+def naive(circles, targets):
+    """Time naive O(m*n) algorithm for detecting collisions."""
+    collisions = []
+    for i in range(len(targets)):
+        for j in range(len(circles)):
+            if defaultCollision(targets[i], circles[j]):
+                collisions.append([targets[i], circles[j]])
+    #print ("numCol:" + str(len(collisions)))
+
+def quadtree(qt, targets):
+    """Time algorithm using Quadtree for detecting collisions."""
+    collisions = []
+    for target in targets:
+        for s in qt.collide(target):
+            collisions.append([target, s])
+    #print ("numCol:" + str(len(collisions)))
+
 def performance():
     """Demonstrate execution performance."""
     n = 16
@@ -9,8 +33,6 @@ def performance():
      
     print ('n', 'Naive Time', 'Quadtree Time')
     while n <= 1024:
-        naive_total = quadtree_total = 0
-        
         circles = []
         targets = []
         for _ in range(n):
@@ -25,44 +47,12 @@ def performance():
             
         # Construct circles as the initial set and a collection of target circles 
         # to be used to check for intersections with the original set. 
-        setup='''
-from quadtree.quad import QuadTree
-from adk.region import Region
-targets = []
-circles = []
-'''
-        for circle in circles:
-            setup = setup + "\ncircles.append([" + ','.join(map(str,circle)) + "])" 
+        qt = QuadTree(Region(0,0,512,512))
+        for s in circles:
+            qt.add(s)
 
-        for target in targets:
-            setup = setup + "\ntargets.append([" + ','.join(map(str,target)) + "])" 
-        
-        setup = setup + '''
-qt = QuadTree(Region(0,0,512,512))
-for s in circles:
-    qt.add(s)
-'''
-
-        # Time naive O(m*n) algorithm for detecting collisions 
-        naive_total += min(timeit.Timer(
-'''
-from quadtree.util import defaultCollision
-collisions = []
-for i in range(len(targets)):
-    for j in range(len(circles)):
-         if defaultCollision(targets[i], circles[j]):
-             collisions.append([targets[i], circles[j]])
-#print ("numCol:" + str(len(collisions)))''', setup=setup).repeat(5,numTrials))
-           
-        # Time algorithm using Quadtree for detecting collisions
-        quadtree_total += min(timeit.Timer(
-'''
-from quadtree.util import defaultCollision
-collisions = []
-for target in targets:
-    for s in qt.collide(target):
-        collisions.append([target, s])
-#print ("numCol:" + str(len(collisions)))''', setup=setup).repeat(5,numTrials))
+        naive_total = min(timeit.Timer(lambda: naive(circles, targets)).repeat(5,numTrials))
+        quadtree_total = min(timeit.Timer(lambda: quadtree(qt, targets)).repeat(5,numTrials))
             
         print ("%d %5.4f %5.4f" % (n, 1000*naive_total/numTrials, 1000*quadtree_total/numTrials))
         n *= 2
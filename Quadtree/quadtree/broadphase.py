@@ -0,0 +1,190 @@
+"""
+Broadphase collision detection for a batch of circles, choosing for each batch
+whichever method should be fastest:
+
+    naive     check every pair with QuadTree.collision
+    columnar  check every pair in a plain Python double loop over (x, y, radius)
+              columns, unless QuadTree.collision has been replaced; still O(n^2),
+              so only used for small batches or where nearly every pair collides
+    grid      bucket circles into a uniform grid whose cells fit the largest circle
+    quadtree  construct a QuadTree over the batch and report its allPairs()
+
+The choice depends on the number of circles and on a quick estimate of how much
+their radii vary and how much of their bounding box they cover. The thresholds
+come from a calibration run (python -m benchmark.calibrate) saved as a JSON
+configuration file, or else from defaults measured on CPython.
+
+Circles only need (x, y, radius) as their first three values and are never
+changed. Every method reports the same pairs, including those between identical
+circles, so the result does not depend on which method is chosen.
+"""
+
+from array import array
+import json
+import math
+import statistics
+
+from adk.region import Region, X, Y
+from quadtree.quad import QuadTree
+from quadtree.util import RADIUS, defaultCollision
+
+# Largest batch for naive and columnar; spread of radii (largest over median) beyond
+# which grid cells become too big, so quadtree is used; coverage (area of circles
+# with median radius over area of bounding box) beyond which nearly every pair is
+# checked anyway, so columnar is used.
+DEFAULTS = {'naive': 8, 'columnar': 16, 'spread': 5.5, 'coverage': 4.0}
+
+# Number of circles sampled to estimate median radius
+SAMPLE = 64
+
+def naivePairs(circles):
+    """Yield colliding pairs by checking every pair."""
+    for i in range(len(circles)):
+        for j in range(i+1, len(circles)):
+            if QuadTree.collision(circles[i], circles[j]):
+                yield (circles[i], circles[j])
+
+def columnarPairs(circles):
+    """
+    Yield colliding pairs by checking every pair, using the distance test directly
+    while QuadTree.collision is defaultCollision; otherwise same as naivePairs().
+    """
+    if QuadTree.collision is not defaultCollision:
+        yield from naivePairs(circles)
+        return
+    
+    xs = array('d', (c[X] for c in circles))
+    ys = array('d', (c[Y] for c in circles))
+    rs = array('d', (c[RADIUS] for c in circles))
+    for i in range(len(circles)):
+        x = xs[i]
+        y = ys[i]
+        r = rs[i]
+        for j in range(i+1, len(circles)):
+            dx = xs[j] - x
+            dy = ys[j] - y
+            if dx*dx + dy*dy <= (rs[j] + r)*(rs[j] + r):
+                yield (circles[i], circles[j])
+
+def gridPairs(circles, cellSize=None):
+    """
+    Yield colliding pairs found by placing each circle in every grid cell that its
+    bounding box overlaps. A pair is only reported by the cell that contains the
+    lower-left corner of the overlap of their bounding boxes, so it appears once.
+    """
+    if cellSize is None:
+        cellSize = 2 * max((c[RADIUS] for c in circles), default=1) or 1
+
+    cells = {}
+    for c in circles:
+        for i in range(math.floor((c[X] - c[RADIUS]) / cellSize), math.floor((c[X] + c[RADIUS]) / cellSize) + 1):
+            for j in range(math.floor((c[Y] - c[RADIUS]) / cellSize), math.floor((c[Y] + c[RADIUS]) / cellSize) + 1):
+                cells.setdefault((i, j), []).append(c)
+
+    for (i, j), members in cells.items():
+        for a in range(len(members)):
+            c1 = members[a]
+            for b in range(a+1, len(members)):
+                c2 = members[b]
+                if (math.floor(max(c1[X] - c1[RADIUS], c2[X] - c2[RADIUS]) / cellSize) == i and
+                    math.floor(max(c1[Y] - c1[RADIUS], c2[Y] - c2[RADIUS]) / cellSize) == j and
+                    QuadTree.collision(c1, c2)):
+                    yield (c1, c2)
+
+def quadtreePairs(circles):
+    """
+    Yield colliding pairs from QuadTree constructed over bounding box of circles. The
+    tree holds a copy of one circle for each distinct (x, y, radius), since it only
+    keeps one of identical circles; its pairs are mapped back to every such circle.
+    """
+    if not circles:
+        return
+    region = Region(math.floor(min(c[X] - c[RADIUS] for c in circles)),
+                    math.floor(min(c[Y] - c[RADIUS] for c in circles)),
+                    math.ceil(max(c[X] + c[RADIUS] for c in circles)),
+                    math.ceil(max(c[Y] + c[RADIUS] for c in circles)))
+
+    groups = {}
+    for c in circles:
+        groups.setdefault((c[X], c[Y], c[RADIUS]), []).append(c)
+    copies = [[key[X], key[Y], key[RADIUS], False, False] for key in groups]
+
+    for group in groups.values():
+        for a in range(len(group)):
+            for b in range(a+1, len(group)):
+                if QuadTree.collision(group[a], group[b]):
+                    yield (group[a], group[b])
+
+    for copy1, copy2 in QuadTree.fromCircles(region, copies).allPairs():
+        for c1 in groups[tuple(copy1[0:3])]:
+            for c2 in groups[tuple(copy2[0:3])]:
+                yield (c1, c2)
+
+METHODS = {
+    'naive'    : naivePairs,
+    'columnar' : columnarPairs,
+    'grid'     : gridPairs,
+    'quadtree' : quadtreePairs,
+}
+
+def estimate(circles):
+    """
+    Return (spread, coverage) of circles: largest radius over median radius, and total
+    area of circles with the median radius over the area of their bounding box. The
+    median comes from a sample, so a few very large circles cannot inflate coverage,
+    while the largest radius, which sizes the cells of gridPairs(), is over all circles.
+    """
+    if not circles:
+        return (1.0, 0.0)
+
+    step = max(1, len(circles) // SAMPLE)
+    median = statistics.median(c[RADIUS] for c in circles[::step])
+    largest = max(c[RADIUS] for c in circles)
+    width = max(c[X] for c in circles) - min(c[X] for c in circles) + 2 * median
+    height = max(c[Y] for c in circles) - min(c[Y] for c in circles) + 2 * median
+    area = math.pi * median * median * len(circles)
+    if median:
+        spread = largest / median
+    else:
+        spread = math.inf if largest else 1.0
+    return (spread, area / max(width * height, 1))
+
+class Broadphase:
+    """Find colliding pairs in batches of circles, choosing the method for each batch."""
+
+    def __init__(self, thresholds=None):
+        """Use given thresholds, with DEFAULTS for any that are missing."""
+        self.thresholds = dict(DEFAULTS)
+        if thresholds:
+            self.thresholds.update(thresholds)
+
+    @classmethod
+    def load(cls, path):
+        """Construct Broadphase from thresholds saved in JSON file at path."""
+        with open(path) as f:
+            return cls(json.load(f))
+
+    def save(self, path):
+        """Write thresholds to JSON file at path."""
+        with open(path, 'w') as f:
+            json.dump(self.thresholds, f, indent=1)
+
+    def choose(self, circles):
+        """Return name of method to use for circles."""
+        t = self.thresholds
+        if len(circles) <= t['naive']:
+            return 'naive'
+        if len(circles) <= t['columnar']:
+            return 'columnar'
+
+        spread, coverage = estimate(circles)
+        if spread > t['spread']:
+            return 'quadtree'
+        if coverage > t['coverage']:
+            return 'columnar'
+        return 'grid'
+
+    def pairs(self, circles):
+        """Yield pairs of colliding circles, found with the method chosen for circles."""
+        circles = list(circles)
+        return METHODS[self.choose(circles)](circles)
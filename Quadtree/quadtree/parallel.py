@@ -0,0 +1,125 @@
+"""
+Parallel batch queries against a read-only circle QuadTree.
+
+The circles of a QuadTree are published once, as packed (x, y, radius) values
+in shared memory. Each worker process rebuilds its own copy of the tree from
+that block when it starts, which takes O(n log n) time and memory in every
+worker; only the circles are shared, not the nodes or columnar arrays of the
+tree, but the tree is never pickled per task. A batch of
+targets is then split into shards, each shard is answered by collideMany() in
+some worker, and the results are merged in shard order.
+
+The tree must not change while a ParallelQuery is open, since workers only
+ever see the circles that were published when it was created.
+"""
+
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+import os
+
+from adk.region import Region, X, Y
+from quadtree.quad import QuadTree
+from quadtree.util import RADIUS, circleKey
+
+# Tree rebuilt by each worker, and position of each circle within published block
+_tree = None
+_positions = None
+
+def _initWorker(name, count, region, looseness, capacity, maxDepth, fractionBits):
+    """Rebuild QuadTree in this worker from circles published in shared memory."""
+    global _tree, _positions
+    block = shared_memory.SharedMemory(name=name)
+    try:
+        values = block.buf[:count * 3 * 8].cast('d')
+        circles = [[values[3*i], values[3*i+1], values[3*i+2], False, False] for i in range(count)]
+        values.release()
+    finally:
+        block.close()
+
+    _positions = {circleKey(circles[i]) : i for i in range(len(circles))}
+    _tree = QuadTree.fromCircles(region, circles, False, looseness, capacity, maxDepth, False, fractionBits)
+
+def _collideShard(start, targets):
+    """Return sorted (target, circle) position pairs for a shard of targets."""
+    indices, circles = _tree.collideMany(targets)
+    pairs = sorted((start + indices[k], _positions[circleKey(circles[k])]) for k in range(len(circles)))
+    return (array('q', [p[0] for p in pairs]), array('q', [p[1] for p in pairs]))
+
+class ParallelQuery:
+    """
+    Answer collideMany() for large batches using a pool of worker processes, each
+    holding its own copy of a frozen QuadTree rebuilt from the published circles.
+    Use as a context manager, or call close() when done, to stop the workers and
+    release the shared memory. Both are also released if the pool cannot start.
+    """
+
+    def __init__(self, tree, workers=None):
+        """Publish circles of tree to shared memory and start the worker pool."""
+        self.circles = list(tree)
+        self.workers = workers or os.cpu_count() or 1
+        self.pool = None
+
+        values = array('d')
+        for c in self.circles:
+            values.extend((c[X], c[Y], c[RADIUS]))
+
+        # Shared memory cannot be empty, so always allocate at least one value
+        self.block = shared_memory.SharedMemory(create=True, size=max(8, len(values) * 8))
+        try:
+            self.block.buf[:len(values) * 8] = values.tobytes()
+
+            # Region of tree is in fixed-point units, which workers convert back
+            r = tree.region
+            s = tree.scale
+            region = Region(r.x_min / s, r.y_min / s, r.x_max / s, r.y_max / s)
+            self.pool = ProcessPoolExecutor(self.workers, initializer=_initWorker,
+                                            initargs=(self.block.name, len(self.circles), region,
+                                                      tree.looseness, tree.capacity, tree.maxDepth, tree.fractionBits))
+        except BaseException:
+            self.close()
+            raise
+
+    def collideMany(self, targets, shardSize=None):
+        """
+        Same as QuadTree.collideMany(), but targets are split into shards that are
+        answered in parallel. Collisions are ordered by position in targets and then
+        by position of the circle in the tree, so results do not depend on scheduling.
+        """
+        targets = [(t[X], t[Y], t[RADIUS]) for t in targets]
+        if shardSize is None:
+            shardSize = max(1, -(-len(targets) // (4 * self.workers)))
+
+        indices = array('q')
+        circles = []
+        try:
+            futures = []
+            for start in range(0, len(targets), shardSize):
+                futures.append(self.pool.submit(_collideShard, start, targets[start:start+shardSize]))
+
+            for future in futures:
+                shardIndices, shardCircles = future.result()
+                indices.extend(shardIndices)
+                circles.extend(self.circles[i] for i in shardCircles)
+        except BrokenProcessPool:
+            # A worker failed to start or died, so the pool can never answer again
+            self.close()
+            raise
+        return (indices, circles)
+
+    def close(self):
+        """Stop worker processes and release shared memory. Safe to call more than once."""
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
+        if self.block is not None:
+            self.block.close()
+            self.block.unlink()
+            self.block = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
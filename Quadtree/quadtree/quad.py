@@ -15,225 +15,1448 @@
     
     When the circles are large, this means the resulting quadtree
     might be skewed with far too many circles stored in upper nodes.
+    A loose QuadTree avoids this by enlarging the bounds of each node
+    by a looseness factor k. A circle is then stored in the child that
+    contains its center, as long as it fits within the loose bounds of 
+    that child, so circles sink to nodes sized to their radius.
+    
+    A QuadTree can optionally use columnar storage, where each node
+    also keeps the (x, y, radius) of its circles in contiguous arrays
+    so collide() can check all circles in a node with one tight loop
+    rather than invoking the collision function once per circle.
+    
+    Node regions always have integer coordinates. To support circles with
+    fractional coordinates, a QuadTree can measure its regions in fixed-point
+    units of 1/2^fractionBits. Circles are quantized to those units, rounding
+    outwards, only to decide where they are stored and which nodes to visit;
+    the original circles are used for all collision tests.
+    
+    A QuadTree can be saved in a compact binary form. The four children of each
+    node are numbered consecutively, and circles are stored in pre-order so that
+    the circles of every subtree are contiguous. A MappedQuadTree answers queries
+    directly from such a file, memory-mapped, without rebuilding any nodes.
 """
 
+from array import array
+import heapq
+import math
+import mmap
+import struct
+import sys
+import timeit
+
 from adk.region import Region, X, Y
-from quadtree.util import intersectsCircle, listContainsCircle, defaultCollision
-from quadtree.util import NE, NW, SW, SE, MULTIPLE
-from quadtree.util import smaller2k, larger2k, deleteIfExists
+from quadtree.util import intersectsCircle, defaultCollision
+from quadtree.util import NE, NW, SW, SE, MULTIPLE, RADIUS
+from quadtree.util import smaller2k, larger2k, circleKey, containsPoint, NO_CHILDREN
+from quadtree.util import preorder, distance, memoryUsage
+
+# Saved QuadTree starts with header, followed by node bounds (x_min, y_min, x_max,
+# y_max) and node table (first child or -1, first circle, circles in node, circles
+# in subtree, spills) then circle columns (x, y, radius, multiple). Little-endian.
+MAGIC = b'QTRE'
+VERSION = 1
+HEADER = struct.Struct('<4sIqqqqqdd4d')
+NODE_FIELDS = 5
 
 class QuadNode:
     
-    def __init__(self, region):
-        """Create QuadNode centered on origin of given region."""
+    __slots__ = ('region', 'bounds', 'children', 'circles', 'tree', 'parent', 'count', 'epoch')
+    
+    def __init__(self, region, tree, parent=None):
+        """
+        Create QuadNode centered on origin of given region. Each node knows its
+        parent, the tree whose circles it stores and the number of circles 
+        stored in the subtree rooted at this node. The bounds of a node are
+        its region, enlarged when tree is loose. Epoch records when node was
+        created, so it is known whether node may be shared with a snapshot.
+        """
         self.region = region
-        self.origin = (region.x_min + (region.x_max - region.x_min)//2, 
-                       region.y_min + (region.y_max - region.y_min)//2) 
-        self.children = [None] * 4
+        if tree.looseness == 1:
+            self.bounds = region
+        else:
+            grow = int((tree.looseness - 1) * (region.x_max - region.x_min)) // 2
+            self.bounds = Region(region.x_min - grow, region.y_min - grow, 
+                                 region.x_max + grow, region.y_max + grow)
+        self.children = NO_CHILDREN
         self.circles = []
+        self.tree = tree
+        self.parent = parent
+        self.count = 0
+        self.epoch = tree.epoch
     
     def collide(self, circle):
         """Yield circles that intersect with circle."""
         
-        # Only proceed if circle intersects region
-        if intersectsCircle(self.region, circle):
-            # if we have circles, must check them
-            for c in self.circles:
+        # Only visit non-empty nodes whose bounds intersect circle
+        probe = self.tree.quantize(circle)
+        for node in preorder(self, lambda n: n.count and intersectsCircle(n.bounds, probe)):
+            for c in node.circles:
                 if QuadTree.collision(c, circle):
                     yield c
-            
-            # Done if no sub-quadrants exist
-            # if self.children[NE] == None: return
-            if self.isLeaf(): return
-
-            for quad in self.quadrants(circle):
-                for c in self.children[quad].collide(circle):
-                    yield c
  
+    @property
+    def origin(self):
+        """Center of region, which splits node into its four quadrants."""
+        return (self.region.x_center, self.region.y_center)
+    
     def isLeaf(self):
         """Determine if QuadNode is a leaf node."""
-        return self.children == [None] * 4
+        return self.children[NE] is None
  
     def add(self, circle):
         """
         Add circle to the QuadNode, subdividing as needed. Returns True if
         not already in collection; False otherwise.
         """
+        # Check for uniqueness before adding.
+        if circleKey(circle) in self.tree.locations:
+            return False
+        
         # Traverse to node whose enclosing region of circle is smallest in tree.
         # Assume that circle will ultimately fit entirely within a leaf node.
         node = self
+        depth = 0
         multiple = False
         while not node.isLeaf():
-            # Find quadrant(s) into which to add; if intersects two or more
-            # then this node keeps it, otherwise we add to that child.
-            quads = node.quadrants(circle)
-            if len(quads) == 1:
-                node = node.children[quads[0]]
-            else:
+            # Find quadrant into which to add; if none then this node keeps
+            # it, otherwise we add to that child.
+            quad = node.destination(circle)
+            if quad is None:
                 multiple = True
                 break
+            node = node.children[quad]
+            depth += 1
 
-        # Either reach leaf node or stop at interior node that must store  
-        # circle. Check for uniqueness before adding. 
-        if listContainsCircle(node.circles, circle):
-            return False
-         
-        node.circles.append(circle) 
-        if node.isLeaf() and len(node.circles) > 4:
+        # Either reach leaf node or stop at interior node that must store circle.
+        # Node (and so self) is replaced by a copy if shared with a snapshot.
+        node = node.writable()
+        node.store(circle)
+        circle[MULTIPLE] = multiple
+        n = node
+        for _ in range(depth):
+            n.count += 1
+            n = n.parent
+        n.count += 1
+        if node.isLeaf() and len(node.circles) > self.tree.capacity and node.divisible():
             node.subdivide()
-        if multiple:
-            circle[MULTIPLE] = True   
         return True
 
+    def load(self, circles):
+        """
+        Bulk load distinct circles into this empty node, partitioning them one 
+        level at a time. Results in the same structure as adding each circle.
+        """
+        pending = [(self, circles)]
+        while pending:
+            node, batch = pending.pop()
+            node.count = len(batch)
+            if len(batch) <= node.tree.capacity or not node.divisible():
+                for circle in batch:
+                    node.store(circle)
+                    circle[MULTIPLE] = False
+                continue
+            
+            # Too many circles, so node is subdivided. Those intersecting two or
+            # more quadrants stay with node; others are loaded into that child.
+            node.makeChildren()
+            groups = [[], [], [], []]
+            for circle in batch:
+                quad = node.destination(circle)
+                if quad is None:
+                    node.store(circle)
+                    circle[MULTIPLE] = True
+                else:
+                    groups[quad].append(circle)
+            
+            for quad in range(len(groups)):
+                pending.append((node.children[quad], groups[quad]))
+
+    def divisible(self):
+        """Determine whether node is large enough to be subdivided."""
+        return self.region.x_max - self.region.x_min > self.tree.minSize
+
+    def makeChildren(self):
+        """Add four empty children nodes to node."""
+        r = self.region
+        node = self.__class__
+        self.children = [None] * 4
+        self.children[NE] = node(Region(r.x_center, r.y_center, r.x_max,    r.y_max),      self.tree, self)
+        self.children[NW] = node(Region(r.x_min,    r.y_center, r.x_center, r.y_max),      self.tree, self)
+        self.children[SW] = node(Region(r.x_min,    r.y_min,    r.x_center, r.y_center),   self.tree, self)
+        self.children[SE] = node(Region(r.x_center, r.y_min,    r.x_max,    r.y_center),   self.tree, self)
+
     def subdivide(self):
         """Add four children nodes to node and reassign existing circles."""
-        r = self.region
-        self.children[NE] = QuadNode(Region(self.origin[X], self.origin[Y], r.x_max,        r.y_max))
-        self.children[NW] = QuadNode(Region(r.x_min,        self.origin[Y], self.origin[X], r.y_max))
-        self.children[SW] = QuadNode(Region(r.x_min,        r.y_min,        self.origin[X], self.origin[Y]))
-        self.children[SE] = QuadNode(Region(self.origin[X], r.y_min,        r.x_max,        self.origin[Y]))
+        self.makeChildren()
         
         # go through completely contained circles and try to push to lowest 
         # children. If intersect 2 or more quadrants then we must keep.
         update = self.circles
-        self.circles = []
+        self.clear()
         for circle in update:
-            quads = self.quadrants(circle)
+            quad = self.destination(circle)
             
             # If circle intersects multiple quadrants, must add to self, and mark
-            # as MULTIPLE, otherwise only add to that individual quadrant 
-            if len(quads) == 1:
-                self.children[quads[0]].add(circle)
-                circle[MULTIPLE] = False
-            else:
-                self.circles.append(circle)
+            # as MULTIPLE, otherwise only add to that individual quadrant. Clear
+            # MULTIPLE first since child may itself subdivide and keep circle.
+            if quad is None:
+                self.store(circle)
                 circle[MULTIPLE] = True 
+            else:
+                circle[MULTIPLE] = False
+                self.children[quad].add(circle)
+    
+    def collapse(self):
+        """
+        Fold all circles in subtree back into this node, which becomes a leaf. 
+        Descendants shared with a snapshot keep copies of their circles, as with
+        writable(), so the tree goes on storing the original circles.
+        """
+        epoch = self.tree.epoch
+        circles = []
+        for node in preorder(self):
+            circles.extend(node.circles)
+            if node.epoch != epoch:
+                node.circles = [list(c) for c in node.circles]
+        self.clear()
+        self.children = NO_CHILDREN
+        for circle in circles:
+            self.store(circle)
+            circle[MULTIPLE] = False
+    
+    def condense(self):
+        """
+        After circles are removed from this node, collapse the highest subdivided 
+        ancestor (or self) whose subtree no longer holds more than capacity circles.
+        """
+        target = None
+        node = self
+        while node is not None and node.count <= self.tree.capacity:
+            if not node.isLeaf():
+                target = node
+            node = node.parent
+        if target is not None:
+            target.collapse()
+    
+    def copy(self, parent):
+        """Return copy of node with given parent, sharing its children."""
+        node = self.__class__.__new__(self.__class__)
+        node.region = self.region
+        node.bounds = self.bounds
+        node.children = self.children if self.isLeaf() else list(self.children)
+        node.circles = list(self.circles)
+        node.tree = self.tree
+        node.parent = parent
+        node.count = self.count
+        node.epoch = self.tree.epoch
+        return node
+    
+    def writable(self):
+        """
+        Return node, if it can be changed. If shared with a snapshot, the node and
+        any shared ancestors are first replaced in the tree by copies, and the 
+        copy is returned. The snapshot keeps its own copies of the circles in
+        node, since the tree changes circles in place when they move.
+        """
+        tree = self.tree
+        if self.epoch == tree.epoch:
+            return self
+        
+        # Ancestors of a node that can be changed can also be changed
+        parent = None if self.parent is None else self.parent.writable()
+        node = self.copy(parent)
+        if parent is None:
+            tree.root = node
+        else:
+            for quad in range(len(parent.children)):
+                if parent.children[quad] is self:
+                    parent.children[quad] = node
+        
+        for child in node.children:
+            if child is not None:
+                child.parent = node
+        for idx in range(len(node.circles)):
+            tree.locations[circleKey(node.circles[idx])] = (node, idx)
+        self.circles = [list(c) for c in self.circles]
+        return node
+    
+    def store(self, circle):
+        """Append circle to those stored by this node, recording its location."""
+        self.tree.locations[circleKey(circle)] = (self, len(self.circles))
+        self.circles.append(circle)
+        self.tree.recordSpill(circle)
+    
+    def discard(self, idx):
+        """
+        Remove circle at given position from those stored by this node. The last
+        circle is moved into its place, so order of circles is not preserved.
+        """
+        del self.tree.locations[circleKey(self.circles[idx])]
+        last = self.circles.pop()
+        if idx < len(self.circles):
+            self.circles[idx] = last
+            self.tree.locations[circleKey(last)] = (self, idx)
+    
+    def relocate(self, idx, x, y):
+        """Change location of circle at given position, which remains in this node."""
+        circle = self.circles[idx]
+        del self.tree.locations[circleKey(circle)]
+        circle[X] = x
+        circle[Y] = y
+        self.tree.locations[circleKey(circle)] = (self, idx)
+        self.tree.recordSpill(circle)
+    
+    def clear(self):
+        """Remove all circles stored by this node, forgetting their locations."""
+        for circle in self.circles:
+            del self.tree.locations[circleKey(circle)]
+        self.circles = []
+    
+    def destination(self, circle):
+        """
+        Return quadrant of child into whose subtree circle is added, or None if
+        circle must be stored by this node (which is always the case for a leaf).
+        For a loose tree, this is the quadrant containing the center of circle, 
+        if circle fits within the bounds of that child. Otherwise it is the only
+        quadrant that intersects circle.
+        """
+        if self.isLeaf():
+            return None
+        
+        circle = self.tree.quantize(circle)
+        if self.tree.looseness == 1:
+            quads = self.quadrants(circle)
+            if len(quads) == 1:
+                return quads[0]
+            return None
+        
+        quad = self.quadrant(circle)
+        b = self.children[quad].bounds
+        if circle[X] - circle[RADIUS] < b.x_min or circle[X] + circle[RADIUS] > b.x_max:
+            return None
+        if circle[Y] - circle[RADIUS] < b.y_min or circle[Y] + circle[RADIUS] > b.y_max:
+            return None
+        return quad
+    
+    def encloses(self, circle):
+        """
+        Determine if circle would be added to the subtree of this node. For a loose
+        tree, the center of circle must be in this region and the circle must fit
+        within bounds. Otherwise circle must be strictly inside region, ignoring
+        those sides which lie on the boundary of the tree, since such a circle 
+        intersects no other node at the same depth.
+        """
+        if self.parent is None:
+            return True
+        
+        circle = self.tree.quantize(circle)
+        r = self.region
+        if self.tree.looseness != 1:
+            b = self.bounds
+            if not containsPoint(r, circle): return False
+            if circle[X] - circle[RADIUS] < b.x_min or circle[X] + circle[RADIUS] > b.x_max: return False
+            if circle[Y] - circle[RADIUS] < b.y_min or circle[Y] + circle[RADIUS] > b.y_max: return False
+            return True
+            
+        bounds = self.tree.region
+        if r.x_min != bounds.x_min and circle[X] - circle[RADIUS] <= r.x_min: return False
+        if r.x_max != bounds.x_max and circle[X] + circle[RADIUS] >= r.x_max: return False
+        if r.y_min != bounds.y_min and circle[Y] - circle[RADIUS] <= r.y_min: return False
+        if r.y_max != bounds.y_max and circle[Y] + circle[RADIUS] >= r.y_max: return False
+        
+        return True
+    
+    def belongs(self, circle):
+        """Determine if circle, enclosed by this node, would be stored in this node."""
+        if not self.encloses(circle):
+            return False
+        
+        return self.destination(circle) is None
+    
+    def spills(self):
+        """
+        Determine if circles in subtree of node may extend past its bounds. Circles 
+        lie within bounds of the node, except at the root of a loose tree and those
+        nodes of a tight tree with a side on the boundary of the tree, where circles
+        can extend past the boundary. Such a circle still intersects the node, so 
+        lies within its diameter (at most tree.spill) of it.
+        """
+        if self.tree.spill == 0:
+            return False
+        if self.parent is None:
+            return True
+        if self.tree.looseness != 1:
+            return False
+        
+        r = self.region
+        t = self.tree.region
+        return r.x_min == t.x_min or r.y_min == t.y_min or r.x_max == t.x_max or r.y_max == t.y_max
+    
+    def extent(self):
+        """Return region enclosing every circle in subtree of node."""
+        b = self.bounds
+        if self.spills():
+            s = self.tree.spill
+            return Region(b.x_min - s, b.y_min - s, b.x_max + s, b.y_max + s)
+        return b
+    
+    def distance(self, pt):
+        """Return lower bound on distance from pt to any circle in subtree of node."""
+        if self.parent is None:
+            return 0
+        
+        b = self.bounds
+        s = self.tree.scale
+        dx = max(b.x_min - pt[X]*s, 0, pt[X]*s - b.x_max)
+        dy = max(b.y_min - pt[Y]*s, 0, pt[Y]*s - b.y_max)
+        dist = (dx*dx + dy*dy) ** 0.5
+        if self.spills():
+            dist = max(0, dist - self.tree.spill)
+        return dist / s
+    
+    def pairs(self, circles):
+        """Yield (c, s) for each circle c that intersects circle s in subtree."""
+        pending = [(self, circles)]
+        while pending:
+            node, active = pending.pop()
+            active = [c for c in active if intersectsCircle(node.bounds, node.tree.quantize(c))]
+            if not active:
+                continue
+            
+            for s in node.circles:
+                for c in active:
+                    if QuadTree.collision(c, s):
+                        yield (c, s)
+            
+            for child in node.children:
+                if child and child.count:
+                    pending.append((child, active))
     
     def quadrants(self, circle):
-        """Determine quadrant(s) intersecting this circle."""
+        """Determine quadrant(s) intersecting this circle, already quantized."""
         quads = []
         if not self.isLeaf():
-            if intersectsCircle(self.children[NE].region, circle): quads.append(NE)
-            if intersectsCircle(self.children[NW].region, circle): quads.append(NW)
-            if intersectsCircle(self.children[SW].region, circle): quads.append(SW)
-            if intersectsCircle(self.children[SE].region, circle): quads.append(SE)
+            if intersectsCircle(self.children[NE].bounds, circle): quads.append(NE)
+            if intersectsCircle(self.children[NW].bounds, circle): quads.append(NW)
+            if intersectsCircle(self.children[SW].bounds, circle): quads.append(SW)
+            if intersectsCircle(self.children[SE].bounds, circle): quads.append(SE)
         return quads
     
     def quadrant(self, pt):
         """Determine quadrant in which point exists."""
-        if pt[X] >= self.origin[X]:
-            if pt[Y] >= self.origin[Y]:
+        if pt[X] >= self.region.x_center:
+            if pt[Y] >= self.region.y_center:
                 return NE
             else:
                 return SE
         else:
-            if pt[Y] >= self.origin[Y]:
+            if pt[Y] >= self.region.y_center:
                 return NW
             else:
                 return SW
      
     def preorder(self):
         """Pre-order traversal of tree rooted at given node."""
-        yield self
-
-        for node in self.children:
-            if node:
-                for n in node.preorder():
-                    yield n
+        return preorder(self)
 
     def __str__(self):
         """toString representation."""
         return "[{} ({}): {},{},{},{}]".format(self.region, self.circles, self.children[NE], self.children[NW], self.children[SW], self.children[SE])
 
+class ColumnarQuadNode(QuadNode):
+    """
+    QuadNode that also stores the (x, y, radius) of its circles in parallel
+    arrays. The original circle objects are retained, in the same order, so
+    they can be returned from queries.
+    """
+    
+    __slots__ = ('xs', 'ys', 'rs')
+    
+    def __init__(self, region, tree, parent=None):
+        """Create ColumnarQuadNode centered on origin of given region."""
+        QuadNode.__init__(self, region, tree, parent)
+        self.clear()
+    
+    def collide(self, circle):
+        """
+        Yield circles that intersect with circle. While QuadTree.collision is
+        defaultCollision, its distance test is made directly against the columns;
+        otherwise each circle is checked with QuadTree.collision, as by QuadNode.
+        """
+        if QuadTree.collision is not defaultCollision:
+            yield from QuadNode.collide(self, circle)
+            return
+        
+        x = circle[X]
+        y = circle[Y]
+        r = circle[RADIUS]
+        probe = self.tree.quantize(circle)
+        for node in preorder(self, lambda n: n.count and intersectsCircle(n.bounds, probe)):
+            for cx, cy, cr, c in zip(node.xs, node.ys, node.rs, node.circles):
+                dx = cx - x
+                dy = cy - y
+                if dx*dx + dy*dy <= (cr + r)*(cr + r):
+                    yield c
+    
+    def store(self, circle):
+        """Append circle and its (x, y, radius) columns."""
+        QuadNode.store(self, circle)
+        self.xs.append(circle[X])
+        self.ys.append(circle[Y])
+        self.rs.append(circle[RADIUS])
+    
+    def copy(self, parent):
+        """Return copy of node, and its columns, with given parent."""
+        node = QuadNode.copy(self, parent)
+        node.xs = array('d', self.xs)
+        node.ys = array('d', self.ys)
+        node.rs = array('d', self.rs)
+        return node
+    
+    def discard(self, idx):
+        """Remove circle, and its columns, at given position."""
+        QuadNode.discard(self, idx)
+        x = self.xs.pop()
+        y = self.ys.pop()
+        r = self.rs.pop()
+        if idx < len(self.xs):
+            self.xs[idx] = x
+            self.ys[idx] = y
+            self.rs[idx] = r
+    
+    def relocate(self, idx, x, y):
+        """Change location of circle, and its columns, at given position."""
+        QuadNode.relocate(self, idx, x, y)
+        self.xs[idx] = x
+        self.ys[idx] = y
+    
+    def clear(self):
+        """Remove all circles and reset columns."""
+        QuadNode.clear(self)
+        self.xs = array('d')
+        self.ys = array('d')
+        self.rs = array('d')
+
 class QuadTree:
 
     # define default collision which can be replaced. Affects all QuadTree objects
     collision = defaultCollision
 
-    def __init__(self, region):
+    def __init__(self, region, columnar=False, looseness=1, capacity=4, maxDepth=None, expand=False, fractionBits=0):
         """
         Create QuadTree defined over existing rectangular region. Assume that (0,0) is
         the lower-left coordinate and the half-length side of any square in quadtree
-        is power of 2. If incoming region is too small, this expands accordingly.    
+        is power of 2. If incoming region is too small, this expands accordingly.
+        When columnar is True, nodes keep (x, y, radius) in arrays for faster collide().
+        A looseness greater than 1 (typically 2) enlarges the bounds of each node.
+        A leaf subdivides once it holds more than capacity circles, unless it is
+        maxDepth levels below the root, in which case it simply overflows. The size
+        of such a node is fixed by the initial region.
+        When expand is True, circles are never rejected: the region grows until it
+        strictly contains each circle that is added. With fractionBits, regions are
+        measured in units of 1/2^fractionBits so nodes can subdivide below unit size.
         """
+        if looseness < 1:
+            raise ValueError("looseness must be at least 1")
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        if maxDepth is not None and maxDepth < 0:
+            raise ValueError("maxDepth must not be negative")
+        if fractionBits < 0:
+            raise ValueError("fractionBits must not be negative")
         self.root = None
-        self.region = region.copy()
+        self.looseness = looseness
+        self.expand = expand
+        self.fractionBits = fractionBits
+        self.scale = 1 << fractionBits
+        self.nodeClass = ColumnarQuadNode if columnar else QuadNode
+        
+        # Maps (x, y, radius) of each circle to (node, position) where it is stored
+        self.locations = {}
+        
+        # Largest diameter of any circle ever stored that extends past region
+        self.spill = 0
+        
+        # Nodes from an earlier epoch may be shared with a snapshot
+        self.epoch = 0
+        
+        # Work done by collide(), only counted once instrument() is called
+        self.counters = None
+        
+        xmin2k = smaller2k(math.floor(region.x_min * self.scale))
+        ymin2k = smaller2k(math.floor(region.y_min * self.scale))
+        xmax2k = larger2k(math.ceil(region.x_max * self.scale))
+        ymax2k = larger2k(math.ceil(region.y_max * self.scale))
         
-        xmin2k = smaller2k(self.region.x_min)
-        ymin2k = smaller2k(self.region.y_min)
-        xmax2k = larger2k(self.region.x_max)
-        ymax2k = larger2k(self.region.y_max)
+        low = min(xmin2k, ymin2k)
+        high = max(xmax2k, ymax2k)
+        self.region = Region(low, low, high, high)
         
-        self.region.x_min = self.region.y_min = min(xmin2k, ymin2k)
-        self.region.x_max = self.region.y_max = max(xmax2k, ymax2k)
+        # Depth limit is kept as the smallest size of node that can subdivide. With
+        # integer origins, nodes of size 1 can never be split meaningfully.
+        self.capacity = capacity
+        self.maxDepth = maxDepth
+        self.minSize = 1
+        if maxDepth is not None:
+            self.minSize = max(1, (self.region.x_max - self.region.x_min) >> maxDepth)
+        
+    @classmethod
+    def fromCircles(cls, region, circles, columnar=False, looseness=1, capacity=4, maxDepth=None, expand=False,
+                    fractionBits=0):
+        """
+        Construct QuadTree over region from a collection of circles in one pass.
+        Produces the same structure (and MULTIPLE flags) as adding each circle
+        in turn, but pushes each circle down the tree only once. When expand is
+        True, the region first grows to contain all circles.
+        """
+        tree = cls(region, columnar, looseness, capacity, maxDepth, expand, fractionBits)
+        
+        # Same circles that add() would accept: within bounds and not duplicate
+        seen = set()
+        unique = []
+        for circle in circles:
+            key = (circle[X], circle[Y], circle[RADIUS])
+            if expand:
+                while not tree.fits(circle):
+                    tree.grow(circle)
+            if key in seen or not intersectsCircle(tree.region, tree.quantize(circle)):
+                continue
+            seen.add(key)
+            unique.append(circle)
+        
+        if unique:
+            tree.root = tree.nodeClass(tree.region, tree)
+            tree.root.load(unique)
+        return tree
         
     def add(self, circle):
         """Add circle to QuadTree."""
+        if self.expand:
+            while not self.fits(circle):
+                self.grow(circle)
+        
         # Return if not within our bounds
-        if not intersectsCircle(self.region, circle):
+        if not intersectsCircle(self.region, self.quantize(circle)):
             return False
         
         if self.root is None:
-            self.root = QuadNode(self.region)
+            self.root = self.nodeClass(self.region, self)
             self.root.add(circle)
             return True
         
         return self.root.add(circle)
     
+    def fits(self, circle):
+        """Determine if circle is strictly inside region of QuadTree."""
+        circle = self.quantize(circle)
+        r = self.region
+        if circle[X] - circle[RADIUS] <= r.x_min or circle[X] + circle[RADIUS] >= r.x_max: return False
+        if circle[Y] - circle[RADIUS] <= r.y_min or circle[Y] + circle[RADIUS] >= r.y_max: return False
+        return True
+    
+    def grow(self, circle):
+        """
+        Double the region of QuadTree, extending it towards circle. The existing root
+        becomes one quadrant of a new root, so no circles are reinserted.
+        """
+        circle = self.quantize(circle)
+        r = self.region
+        size = max(1, r.x_max - r.x_min)
+        x_min = r.x_min - size if circle[X] - circle[RADIUS] <= r.x_min else r.x_min
+        y_min = r.y_min - size if circle[Y] - circle[RADIUS] <= r.y_min else r.y_min
+        self.region = Region(x_min, y_min, x_min + 2*size, y_min + 2*size)
+        
+        if self.root is None:
+            return
+        
+        # Queries recognise the root by it having no parent, so a root shared with
+        # a snapshot is copied rather than given a parent
+        old = self.root.writable()
+        self.root = self.nodeClass(self.region, self)
+        self.root.makeChildren()
+        self.root.children[self.root.quadrant((old.region.x_min, old.region.y_min))] = old
+        self.root.count = old.count
+        old.parent = self.root
+    
+    def quantize(self, circle):
+        """
+        Return (x, y, radius) of circle in the fixed-point units of node regions,
+        rounded so that it encloses circle. Circle is returned when there are no
+        fraction bits, so integer circles are used as they are.
+        """
+        if self.scale == 1:
+            return circle
+        
+        s = self.scale
+        return (round(circle[X] * s), round(circle[Y] * s), math.ceil(circle[RADIUS] * s) + 1)
+    
+    def recordSpill(self, circle):
+        """Track largest diameter of circles that extend past region of QuadTree."""
+        circle = self.quantize(circle)
+        r = self.region
+        if (circle[X] - circle[RADIUS] < r.x_min or circle[X] + circle[RADIUS] > r.x_max or 
+            circle[Y] - circle[RADIUS] < r.y_min or circle[Y] + circle[RADIUS] > r.y_max):
+            self.spill = max(self.spill, 2 * circle[RADIUS])
+    
     def collide(self, circle):
         """Return collisions to circle within QuadTree."""
         if self.root is None:
             return iter([])
+        if self.counters is not None:
+            return self.countedCollide(circle)
         
         return self.root.collide(circle)
     
-    def remove(self, circle):
-        """Remove circle should it exist in QuadTree. Return True on success."""
+    def instrument(self, enabled=True):
+        """
+        Start (or stop) counting the work done by collide(): queries, nodes visited, 
+        intersectsCircle() calls, collision tests and results. Counters restart from
+        zero. When not enabled, collide() is unaffected.
+        """
+        self.counters = None
+        if enabled:
+            self.counters = dict.fromkeys(('queries', 'nodes', 'intersects', 'collisions', 'results'), 0)
+    
+    def countedCollide(self, circle):
+        """
+        Same as collide() while updating counters. Each circle is checked with 
+        QuadTree.collision, even by columnar nodes.
+        """
+        counters = self.counters
+        counters['queries'] += 1
+        probe = self.quantize(circle)
         
-        # Find largest node which wholly contains circle
-        lastNode = None
-        node = self.root
-        while node:
-            quads = node.quadrants(circle)
-            if len(quads) == 1:
-                lastNode = node
-                node = node.children[quads[0]]
+        def enter(node):
+            if not node.count:
+                return False
+            counters['intersects'] += 1
+            return intersectsCircle(node.bounds, probe)
+        
+        for node in preorder(self.root, enter):
+            counters['nodes'] += 1
+            for c in node.circles:
+                counters['collisions'] += 1
+                if QuadTree.collision(c, circle):
+                    counters['results'] += 1
+                    yield c
+    
+    def stats(self):
+        """
+        Return dictionary describing the shape of QuadTree: number of circles, nodes
+        and leaves, maximum depth, 'depths' histogram of nodes at each depth, 
+        'occupancy' histogram of leaves by number of circles, and 'multiple', the
+        circles kept by interior nodes because they span quadrants. A skewed tree
+        shows up as deep, crowded leaves or many such circles. Once instrumented,
+        it also contains the counters and 'pruning', the fraction of circles that
+        collide() did not have to check.
+        """
+        depths = {}
+        occupancy = {}
+        multiple = leaves = 0
+        pending = [] if self.root is None else [(self.root, 0)]
+        while pending:
+            node, depth = pending.pop()
+            depths[depth] = depths.get(depth, 0) + 1
+            if node.isLeaf():
+                leaves += 1
+                occupancy[len(node.circles)] = occupancy.get(len(node.circles), 0) + 1
             else:
-                lastNode = node
+                multiple += len(node.circles)
+                for child in node.children:
+                    pending.append((child, depth + 1))
+        
+        report = {'circles': len(self), 'nodes': sum(depths.values()), 'leaves': leaves,
+                  'depth': max(depths, default=0), 'depths': depths, 'occupancy': occupancy,
+                  'multiple': multiple}
+        if self.counters is not None:
+            report.update(self.counters)
+            checked = self.counters['queries'] * len(self)
+            report['pruning'] = 1 - self.counters['collisions'] / checked if checked else 0.0
+        return report
+    
+    def collideSwept(self, circle, dx, dy):
+        """
+        Return (t, c) for each circle c hit by circle as it moves by (dx, dy), where
+        0 <= t <= 1 is the fraction of the move at which they first touch (0 if they
+        already intersect). Results are ordered by t. Only nodes that overlap the box
+        enclosing the swept circle are visited, so fast moving circles cannot tunnel 
+        through circles between their start and end locations.
+        """
+        result = []
+        if self.root is None:
+            return result
+        
+        x, y, r = circle[X], circle[Y], circle[RADIUS]
+        s = self.scale
+        swept = Region((min(x, x + dx) - r) * s, (min(y, y + dy) - r) * s, 
+                       (max(x, x + dx) + r) * s, (max(y, y + dy) + r) * s)
+        a = dx*dx + dy*dy
+        
+        pending = [self.root]
+        while pending:
+            node = pending.pop()
+            for c in node.circles:
+                # Solve |(x,y) + t*(dx,dy) - c|^2 = (r + c[RADIUS])^2 for earliest t
+                ox = x - c[X]
+                oy = y - c[Y]
+                reach = r + c[RADIUS]
+                gap = ox*ox + oy*oy - reach*reach
+                if gap <= 0:
+                    result.append((0, c))
+                    continue
+                
+                b = dx*ox + dy*oy
+                if a == 0 or b >= 0 or b*b < a*gap:
+                    continue
+                t = (-b - (b*b - a*gap) ** 0.5) / a
+                if t <= 1:
+                    result.append((t, c))
+            
+            for child in node.children:
+                if child is not None and child.count and swept.overlaps(child.extent()):
+                    pending.append(child)
+        
+        result.sort(key=lambda hit: hit[0])
+        return result
+    
+    def collideMany(self, targets):
+        """
+        Find collisions between a batch of target circles, each a sequence whose first 
+        three values are (x, y, radius), and circles in QuadTree. Each node is visited
+        once for the whole batch, checking only those targets that intersect its bounds.
+        Returns (indices, circles) where indices is an integer array of positions in
+        targets and circles is the parallel list of colliding circles, grouped by node.
+        """
+        indices = array('q')
+        circles = []
+        if self.root is None:
+            return (indices, circles)
+        
+        targets = [(t[X], t[Y], t[RADIUS]) for t in targets]
+        probes = [self.quantize(t) for t in targets]
+        pending = [(self.root, range(len(targets)))]
+        while pending:
+            node, active = pending.pop()
+            active = [i for i in active if intersectsCircle(node.bounds, probes[i])]
+            if not active:
+                continue
+            
+            for c in node.circles:
+                for i in active:
+                    if QuadTree.collision(c, targets[i]):
+                        indices.append(i)
+                        circles.append(c)
+            
+            for child in node.children:
+                if child is not None and child.count:
+                    pending.append((child, active))
+        
+        return (indices, circles)
+    
+    def nearest(self, pt, k=1):
+        """
+        Return (distance, circle) for the k circles closest to pt, closest first. 
+        Distance is measured to the boundary of each circle, and is 0 when pt lies
+        within a circle.
+        """
+        return self.nearestWithin(pt, k, math.inf)
+    
+    def nearestWithin(self, pt, k, maxDist):
+        """
+        Return (distance, circle) for up to k circles closest to pt, closest first,
+        ignoring those further than maxDist. Nodes and circles are explored best-first
+        from a priority queue, keyed on the distance from pt to each.
+        """
+        result = []
+        if self.root is None or k < 1:
+            return result
+        
+        # Entries are (distance, tiebreak, node, circle); circle is None for a node
+        tiebreak = 0
+        queue = [(0, tiebreak, self.root, None)]
+        while queue:
+            dist, _, node, circle = heapq.heappop(queue)
+            if dist > maxDist:
                 break
-                    
-        # lastNode is the only node which could contain circle
-        return deleteIfExists(lastNode, circle)
+            
+            if circle is not None:
+                result.append((dist, circle))
+                if len(result) == k:
+                    break
+                continue
+            
+            for c in node.circles:
+                d = max(0, distance(pt, c) - c[RADIUS])
+                if d <= maxDist:
+                    tiebreak += 1
+                    heapq.heappush(queue, (d, tiebreak, node, c))
+            
+            for child in node.children:
+                if child is not None and child.count:
+                    d = child.distance(pt)
+                    if d <= maxDist:
+                        tiebreak += 1
+                        heapq.heappush(queue, (d, tiebreak, child, None))
+        
+        return result
     
-    def __contains__(self, circle):
-        """Check whether exact circle (x,y,r) appears in QuadTree."""
-        if not intersectsCircle(self.region, circle):
+    def queryRegion(self, region):
+        """
+        Yield circles in QuadTree that overlap rectangular region. Once region
+        contains the bounds of a node, all circles in its subtree are yielded 
+        without checking each one.
+        """
+        if self.root is None:
+            return
+        
+        s = self.scale
+        scaled = Region(region.x_min * s, region.y_min * s, region.x_max * s, region.y_max * s)
+        pending = [self.root]
+        while pending:
+            node = pending.pop()
+            if scaled.containsRegion(node.bounds) and (s == 1 or not node.spills()):
+                for n in preorder(node):
+                    for c in n.circles:
+                        yield c
+                continue
+            
+            for c in node.circles:
+                dx = max(region.x_min - c[X], 0, c[X] - region.x_max)
+                dy = max(region.y_min - c[Y], 0, c[Y] - region.y_max)
+                if dx*dx + dy*dy <= c[RADIUS]*c[RADIUS]:
+                    yield c
+            
+            for child in node.children:
+                if child is not None and child.count and scaled.overlaps(child.extent()):
+                    pending.append(child)
+    
+    def countRegion(self, region):
+        """
+        Return number of circles in QuadTree that overlap rectangular region. Once
+        region contains the bounds of a node, its subtree is counted as a whole.
+        """
+        if self.root is None:
+            return 0
+        
+        total = 0
+        s = self.scale
+        scaled = Region(region.x_min * s, region.y_min * s, region.x_max * s, region.y_max * s)
+        pending = [self.root]
+        while pending:
+            node = pending.pop()
+            if scaled.containsRegion(node.bounds) and (s == 1 or not node.spills()):
+                total += node.count
+                continue
+            
+            for c in node.circles:
+                dx = max(region.x_min - c[X], 0, c[X] - region.x_max)
+                dy = max(region.y_min - c[Y], 0, c[Y] - region.y_max)
+                if dx*dx + dy*dy <= c[RADIUS]*c[RADIUS]:
+                    total += 1
+            
+            for child in node.children:
+                if child is not None and child.count and scaled.overlaps(child.extent()):
+                    pending.append(child)
+        return total
+    
+    def remove(self, circle):
+        """Remove circle should it exist in QuadTree. Return True on success."""
+        location = self.locations.get(circleKey(circle))
+        if location is None:
             return False
         
-        # Find largest node which wholly contains circle
-        lastNode = None
-        node = self.root
-        while node:
-            # If leaf node, done
+        lastNode, idx = location
+        lastNode = lastNode.writable()
+        lastNode.discard(idx)
+        node = lastNode
+        while node is not None:
+            node.count -= 1
+            node = node.parent
+        lastNode.condense()
+        return True
+    
+    def move(self, circle, x, y):
+        """
+        Move circle in QuadTree to new (x,y) location. Circle is only relocated
+        if it no longer belongs in the node storing it, in which case it is 
+        re-added from the lowest ancestor that still contains it. Subtrees left
+        with too few circles are collapsed. Behaves like remove() followed by 
+        add(), so returns False (and circle is no longer in QuadTree) if new 
+        location is outside of QuadTree or duplicates an existing circle.
+        """
+        location = self.locations.get(circleKey(circle))
+        if location is None:
+            return False
+        
+        node, idx = location
+        node = node.writable()
+        circle = node.circles[idx]
+        key = (x, y, circle[RADIUS])
+        duplicate = key != circleKey(circle) and key in self.locations
+        if self.expand:
+            while not self.fits(key):
+                self.grow(key)
+        inside = intersectsCircle(self.region, self.quantize(key))
+        
+        # Common case: circle still belongs in same node
+        if inside and not duplicate and node.belongs(key):
+            node.relocate(idx, x, y)
+            return True
+        
+        # Detach and find lowest ancestor whose subtree still holds circle
+        node.discard(idx)
+        circle[X] = x
+        circle[Y] = y
+        ancestor = node
+        ancestor.count -= 1
+        while not ancestor.encloses(circle):
+            ancestor = ancestor.parent
+            ancestor.count -= 1
+        
+        added = False
+        if inside:
+            added = ancestor.add(circle)
+        if not added:
+            ancestor = ancestor.parent
+            while ancestor is not None:
+                ancestor.count -= 1
+                ancestor = ancestor.parent
+        
+        node.condense()
+        return added
+    
+    def update(self, moves):
+        """
+        Move many circles at once, given (circle, x, y) for each. Unlike calling move()
+        for each in turn, a circle is not lost when its new location matches that of a
+        circle which has yet to move: such circles are removed and re-added once all
+        others have moved. Returns list of circles no longer in QuadTree, because their
+        new location is outside of QuadTree or matches that of another circle.
+        """
+        deferred = []
+        dropped = []
+        for circle, x, y in moves:
+            key = (x, y, circle[RADIUS])
+            if key != circleKey(circle) and key in self.locations:
+                if self.remove(circle):
+                    deferred.append((circle, x, y))
+            elif not self.move(circle, x, y):
+                dropped.append(circle)
+        
+        for circle, x, y in deferred:
+            circle[X] = x
+            circle[Y] = y
+            if not self.add(circle):
+                dropped.append(circle)
+        return dropped
+    
+    def snapshot(self):
+        """
+        Return read-only QuadTreeSnapshot of QuadTree as it is now. The snapshot 
+        shares all nodes with QuadTree, which copies a node (and its ancestors) 
+        the first time it is changed afterwards, so snapshots are cheap to take.
+        """
+        self.epoch += 1
+        return QuadTreeSnapshot(self)
+    
+    def allPairs(self):
+        """
+        Yield each pair of intersecting circles in QuadTree exactly once. Makes
+        a single traversal, checking circles in each node against each other
+        and against those circles from ancestor nodes that intersect the node.
+        In a loose tree, the bounds of sibling nodes overlap, so circles in
+        sibling subtrees whose bounds overlap are also checked.
+        """
+        if self.root is None:
+            return
+        
+        crossing = []
+        pending = [(self.root, [])]
+        while pending:
+            node, active = pending.pop()
+            circles = node.circles
+            for i in range(len(circles)):
+                c = circles[i]
+                for a in active:
+                    if QuadTree.collision(a, c):
+                        yield (a, c)
+                for j in range(i+1, len(circles)):
+                    if QuadTree.collision(circles[j], c):
+                        yield (c, circles[j])
+            
             if node.isLeaf():
-                lastNode = node
-                break
-             
-            quads = node.quadrants(circle)
-            if len(quads) == 1:
-                lastNode = node
-                node = node.children[quads[0]]
-            else:
-                lastNode = node
-                break
-                    
-        # lastNode is the only node which could contain circle
-        return listContainsCircle(lastNode.circles, circle)
+                continue
+            
+            # Only circles intersecting a child can intersect circles in its subtree
+            candidates = active + circles
+            children = [child for child in node.children if child.count]
+            for child in children:
+                pending.append((child, [a for a in candidates if intersectsCircle(child.bounds, self.quantize(a))]))
+            
+            if self.looseness != 1:
+                for i in range(len(children)):
+                    for j in range(i+1, len(children)):
+                        crossing.append((children[i], children[j]))
+        
+        # Pairs of disjoint subtrees, only present in a loose tree
+        while crossing:
+            a, b = crossing.pop()
+            if not a.bounds.overlaps(b.bounds):
+                continue
+            
+            for c in a.circles:
+                for d in b.circles:
+                    if QuadTree.collision(c, d):
+                        yield (c, d)
+            
+            achildren = [child for child in a.children if child and child.count]
+            bchildren = [child for child in b.children if child and child.count]
+            for child in bchildren:
+                for pair in child.pairs(a.circles):
+                    yield pair
+            for child in achildren:
+                for pair in child.pairs(b.circles):
+                    yield pair
+            for achild in achildren:
+                for bchild in bchildren:
+                    crossing.append((achild, bchild))
+    
+    def __contains__(self, circle):
+        """Check whether exact circle (x,y,r) appears in QuadTree."""
+        return circleKey(circle) in self.locations
+    
+    def __len__(self):
+        """Return number of circles in the QuadTree."""
+        if self.root is None:
+            return 0
+        return self.root.count
     
     def __iter__(self):
         """Traverse and emit all circles in the QuadTree."""
-        if self.root:
-            for node in self.root.preorder():
-                if node.circles:
-                    for c in node.circles:
+        for node in preorder(self.root):
+            for c in node.circles:
+                yield c
+    
+    def memoryUsage(self):
+        """
+        Return bytes used by QuadTree, split into 'nodes', their 'regions' and bounds,
+        'children' lists, 'circles' (with the lists and columns storing them) and the
+        'index' of circle locations, which is 0 for a snapshot. Values held by circles
+        are included.
+        """
+        nodes = list(preorder(self.root))
+        
+        def circles():
+            for node in nodes:
+                yield node.circles
+                if isinstance(node, ColumnarQuadNode):
+                    yield node.xs
+                    yield node.ys
+                    yield node.rs
+                for c in node.circles:
+                    yield c
+                    yield from c
+        
+        def index():
+            if self.locations is None:
+                return
+            yield self.locations
+            for key, location in self.locations.items():
+                yield key
+                yield location
+        
+        return memoryUsage([('nodes', nodes), 
+                            ('regions', (r for n in nodes for r in (n.region, n.bounds))),
+                            ('children', (n.children for n in nodes)),
+                            ('circles', circles()),
+                            ('index', index())])
+    
+    def save(self, path):
+        """
+        Write QuadTree to path in binary form, to be opened by openMmap(). Only the
+        (x, y, radius) and MULTIPLE flag of each circle are kept.
+        """
+        nodes = [] if self.root is None else [self.root]
+        i = 0
+        while i < len(nodes):
+            if not nodes[i].isLeaf():
+                nodes.extend(nodes[i].children)
+            i += 1
+        index = {id(nodes[i]) : i for i in range(len(nodes))}
+        
+        bounds = array('d', [0]) * (4 * len(nodes))
+        table = array('q', [0]) * (NODE_FIELDS * len(nodes))
+        xs = array('d')
+        ys = array('d')
+        rs = array('d')
+        multiple = array('B')
+        for node in preorder(self.root):
+            i = index[id(node)]
+            b = node.bounds
+            first = -1 if node.isLeaf() else index[id(node.children[NE])]
+            bounds[4*i:4*i+4] = array('d', (b.x_min, b.y_min, b.x_max, b.y_max))
+            table[NODE_FIELDS*i:NODE_FIELDS*i+NODE_FIELDS] = array('q', (first, len(xs), len(node.circles), 
+                                                                        node.count, node.spills()))
+            for c in node.circles:
+                xs.append(c[X])
+                ys.append(c[Y])
+                rs.append(c[RADIUS])
+                multiple.append(bool(c[MULTIPLE]))
+        
+        columns = (bounds, table, xs, ys, rs, multiple)
+        if sys.byteorder != 'little':
+            for column in columns:
+                column.byteswap()
+        
+        r = self.region
+        maxDepth = -1 if self.maxDepth is None else self.maxDepth
+        with open(path, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, VERSION, len(nodes), len(xs), self.fractionBits, self.capacity, 
+                                maxDepth, self.looseness, self.spill, r.x_min, r.y_min, r.x_max, r.y_max))
+            for column in columns:
+                column.tofile(f)
+    
+    @staticmethod
+    def openMmap(path):
+        """Return read-only MappedQuadTree answering queries from file saved at path."""
+        return MappedQuadTree(path)
+
+
+class QuadTreeSnapshot(QuadTree):
+    """
+    Read-only view of a QuadTree as it was when its snapshot() was taken. It can
+    be queried from other threads, without locks, while the QuadTree is changed
+    by a single writer, since the QuadTree never changes nodes it shares, other
+    than their parent. A shared node whose parent is copied points to that copy,
+    which is harmless since queries only use parent to recognise the root (in
+    spills() and distance()), and the root of a snapshot never gains a parent.
+    """
+    
+    def __init__(self, tree):
+        """Create view of tree, which must then not change any of its nodes."""
+        self.__dict__.update(tree.__dict__)
+        
+        # Locations of circles only describe the live tree, whose counters are
+        # never updated by queries of snapshot (which may be on other threads)
+        self.locations = None
+        self.counters = None
+    
+    def add(self, circle):
+        """Snapshot cannot be changed."""
+        raise TypeError("QuadTree snapshot cannot be changed")
+    
+    def remove(self, circle):
+        """Snapshot cannot be changed."""
+        raise TypeError("QuadTree snapshot cannot be changed")
+    
+    def move(self, circle, x, y):
+        """Snapshot cannot be changed."""
+        raise TypeError("QuadTree snapshot cannot be changed")
+    
+    def snapshot(self):
+        """Snapshot is already unchanging, so it is its own snapshot."""
+        return self
+    
+    def __contains__(self, circle):
+        """Check whether exact circle (x,y,r) appears in snapshot."""
+        key = circleKey(circle)
+        for c in self.collide(circle):
+            if circleKey(c) == key:
+                return True
+        return False
+
+
+class MappedQuadTree:
+    """
+    Read-only QuadTree whose nodes and circles are read directly from a file written
+    by QuadTree.save(). The file is memory-mapped, so opening costs the same for any
+    size of tree, and its pages are shared by all processes that open the same file.
+    Circles are yielded as new [x, y, radius, False, multiple] lists. Like columnar
+    nodes, collide() checks distances directly while QuadTree.collision is 
+    defaultCollision. Call close() (or use as a context manager) once done.
+    """
+    
+    # Same rounding as QuadTree, which only depends on scale
+    quantize = QuadTree.quantize
+    
+    def __init__(self, path):
+        """Map file at path and validate its header."""
+        if sys.byteorder != 'little':
+            raise ValueError("MappedQuadTree requires a little-endian machine")
+        with open(path, 'rb') as f:
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        
+        if len(self.map) < HEADER.size:
+            self.map.close()
+            raise ValueError("{} is not a saved QuadTree".format(path))
+        (magic, version, self.nodeCount, self.circleCount, self.fractionBits, self.capacity, maxDepth,
+         self.looseness, self.spill, x_min, y_min, x_max, y_max) = HEADER.unpack_from(self.map)
+        size = HEADER.size + 8 * (4 + NODE_FIELDS) * self.nodeCount + (3 * 8 + 1) * self.circleCount
+        if magic != MAGIC or version != VERSION or len(self.map) != size:
+            self.map.close()
+            raise ValueError("{} is not a saved QuadTree (version {})".format(path, VERSION))
+        
+        self.scale = 1 << self.fractionBits
+        self.maxDepth = None if maxDepth < 0 else maxDepth
+        self.region = Region(x_min, y_min, x_max, y_max)
+        
+        self.view = memoryview(self.map)
+        offset = HEADER.size
+        columns = []
+        for fmt, n in (('d', 4 * self.nodeCount), ('q', NODE_FIELDS * self.nodeCount), ('d', self.circleCount),
+                       ('d', self.circleCount), ('d', self.circleCount), ('B', self.circleCount)):
+            end = offset + n * struct.calcsize(fmt)
+            columns.append(self.view[offset:end].cast(fmt))
+            offset = end
+        self.bounds, self.table, self.xs, self.ys, self.rs, self.multiple = columns
+    
+    def close(self):
+        """Release the memory-mapped file."""
+        for column in (self.bounds, self.table, self.xs, self.ys, self.rs, self.multiple):
+            column.release()
+        self.view.release()
+        self.map.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *args):
+        self.close()
+    
+    def circle(self, idx):
+        """Return circle stored at given position."""
+        return [self.xs[idx], self.ys[idx], self.rs[idx], False, bool(self.multiple[idx])]
+    
+    def intersects(self, node, circle):
+        """Same as intersectsCircle() for bounds of node, given by its number."""
+        b = self.bounds
+        x_half = (b[4*node+2] - b[4*node]) / 2
+        y_half = (b[4*node+3] - b[4*node+1]) / 2
+        radius = circle[RADIUS]
+        dx = abs(circle[X] - b[4*node] - x_half)
+        dy = abs(circle[Y] - b[4*node+1] - y_half)
+        
+        if dx > radius + x_half or dy > radius + y_half:
+            return False 
+        if dx <= x_half or dy <= y_half:
+            return True 
+        return (dx - x_half) ** 2 + (dy - y_half) ** 2 <= radius ** 2
+    
+    def collide(self, circle):
+        """Yield circles that intersect with circle."""
+        x = circle[X]
+        y = circle[Y]
+        r = circle[RADIUS]
+        probe = self.quantize(circle)
+        direct = QuadTree.collision is defaultCollision
+        table = self.table
+        pending = [0] if self.nodeCount else []
+        while pending:
+            node = pending.pop()
+            first, start, count, total, _ = table[NODE_FIELDS*node:NODE_FIELDS*node+NODE_FIELDS]
+            if not total or not self.intersects(node, probe):
+                continue
+            
+            for idx in range(start, start + count):
+                if not direct:
+                    c = self.circle(idx)
+                    if QuadTree.collision(c, circle):
                         yield c
+                    continue
+                
+                dx = self.xs[idx] - x
+                dy = self.ys[idx] - y
+                cr = self.rs[idx]
+                if dx*dx + dy*dy <= (cr + r)*(cr + r):
+                    yield self.circle(idx)
+            if first >= 0:
+                pending.extend(range(first + SE, first - 1, -1))
+    
+    def ranges(self, region):
+        """
+        Yield (start, end, whole) ranges of circle positions that may overlap region.
+        When whole is True, every circle in range lies in a subtree contained by region.
+        """
+        s = self.scale
+        scaled = (region.x_min * s, region.y_min * s, region.x_max * s, region.y_max * s)
+        b = self.bounds
+        table = self.table
+        pending = [0] if self.nodeCount else []
+        while pending:
+            node = pending.pop()
+            first, start, count, total, spills = table[NODE_FIELDS*node:NODE_FIELDS*node+NODE_FIELDS]
+            x_min, y_min, x_max, y_max = b[4*node:4*node+4]
+            if spills:
+                x_min, y_min, x_max, y_max = (x_min - self.spill, y_min - self.spill, 
+                                              x_max + self.spill, y_max + self.spill)
+            if not total or x_max < scaled[0] or x_min > scaled[2] or y_max < scaled[1] or y_min > scaled[3]:
+                continue
+            
+            if (scaled[0] <= b[4*node] and b[4*node+2] <= scaled[2] and 
+                scaled[1] <= b[4*node+1] and b[4*node+3] <= scaled[3] and (s == 1 or not spills)):
+                yield (start, start + total, True)
+                continue
+            
+            yield (start, start + count, False)
+            if first >= 0:
+                pending.extend(range(first + SE, first - 1, -1))
+    
+    def overlaps(self, idx, region):
+        """Determine if circle at given position overlaps rectangular region."""
+        dx = max(region.x_min - self.xs[idx], 0, self.xs[idx] - region.x_max)
+        dy = max(region.y_min - self.ys[idx], 0, self.ys[idx] - region.y_max)
+        return dx*dx + dy*dy <= self.rs[idx]*self.rs[idx]
+    
+    def queryRegion(self, region):
+        """Yield circles that overlap rectangular region, as QuadTree.queryRegion()."""
+        for start, end, whole in self.ranges(region):
+            for idx in range(start, end):
+                if whole or self.overlaps(idx, region):
+                    yield self.circle(idx)
+    
+    def countRegion(self, region):
+        """Return number of circles that overlap rectangular region."""
+        total = 0
+        for start, end, whole in self.ranges(region):
+            if whole:
+                total += end - start
+            else:
+                total += sum(1 for idx in range(start, end) if self.overlaps(idx, region))
+        return total
+    
+    def __contains__(self, circle):
+        """Check whether exact circle (x,y,r) appears in tree."""
+        key = circleKey(circle)
+        for c in self.collide(circle):
+            if circleKey(c) == key:
+                return True
+        return False
+    
+    def __len__(self):
+        """Return number of circles in tree."""
+        return self.circleCount
+    
+    def __iter__(self):
+        """Emit all circles, in the same order as the QuadTree that was saved."""
+        for idx in range(self.circleCount):
+            yield self.circle(idx)
+
+
+def recommendCapacity(region, circles, targets, capacities=(1, 2, 4, 8, 16, 32), columnar=False, looseness=1):
+    """
+    Recommend node capacity for a sample workload. For each candidate capacity, time
+    how long it takes to construct a QuadTree from circles and then collide each of
+    the targets against it. Returns best capacity and dictionary of all timings.
+    """
+    timings = {}
+    for capacity in capacities:
+        start = timeit.default_timer()
+        tree = QuadTree.fromCircles(region, [list(c) for c in circles], columnar, looseness, capacity)
+        for target in targets:
+            for _ in tree.collide(target):
+                pass
+        timings[capacity] = timeit.default_timer() - start
+    
+    best = min(timings, key=timings.get)
+    return best, timings
@@ -12,18 +12,23 @@
 """
 
 from adk.region import Region, X, Y
-from quadtree.util import NW, NE, SW, SE
+from quadtree.util import NW, NE, SW, SE, NO_CHILDREN, preorder, memoryUsage
 
 class QuadNode:
     
+    __slots__ = ('region', 'children', 'full')
+    
     def __init__(self, region, isFull = False):
         """Create empty QuadNode centered on origin of given region."""
         self.region = region
-        self.origin = (region.x_min + (region.x_max - region.x_min)//2, 
-                       region.y_min + (region.y_max - region.y_min)//2) 
-        self.children = [None] * 4
+        self.children = NO_CHILDREN
         self.full = isFull
     
+    @property
+    def origin(self):
+        """Center of region, which splits node into its four quadrants."""
+        return (self.region.x_center, self.region.y_center)
+    
     def isPoint(self):
         """
         Determine if associated region is a single point. Region is closed on min,
@@ -45,6 +50,8 @@ class QuadNode:
         # Find quadrant into which point is to be inserted and create if empty
         quad = self.quadrant(pt)
         
+        if self.children is NO_CHILDREN:
+            self.children = [None] * 4
         if self.children[quad] == None:
             self.children[quad] = QuadNode(self.subregion(quad))
             self.children[quad].add(pt)
@@ -59,16 +66,17 @@ class QuadNode:
         """Return region associated with given quadrant."""
         r = self.region
         if quad is NE:
-            return Region(self.origin[X], self.origin[Y], r.x_max,        r.y_max)
+            return Region(r.x_center, r.y_center, r.x_max,    r.y_max)
         if quad is NW:
-            return Region(r.x_min,        self.origin[Y], self.origin[X], r.y_max)
+            return Region(r.x_min,    r.y_center, r.x_center, r.y_max)
         if quad is SW:
-            return Region(r.x_min,        r.y_min,        self.origin[X], self.origin[Y])
+            return Region(r.x_min,    r.y_min,    r.x_center, r.y_center)
         if quad is SE:
-            return Region(self.origin[X], r.y_min,        r.x_max,        self.origin[Y])
+            return Region(r.x_center, r.y_min,    r.x_max,    r.y_center)
     
     def subdivide(self):
         """Add four children nodes to node, retaining full status of parent."""
+        self.children = [None] * 4
         self.children[NE] = QuadNode(self.subregion(NE), self.full)
         self.children[NW] = QuadNode(self.subregion(NW), self.full)
         self.children[SW] = QuadNode(self.subregion(SW), self.full)
@@ -76,13 +84,13 @@ class QuadNode:
     
     def quadrant(self, pt):
         """Determine quadrant in which point exists."""
-        if pt[X] >= self.origin[X]:
-            if pt[Y] >= self.origin[Y]:
+        if pt[X] >= self.region.x_center:
+            if pt[Y] >= self.region.y_center:
                 return NE
             else:
                 return SE
         else:
-            if pt[Y] >= self.origin[Y]:
+            if pt[Y] >= self.region.y_center:
                 return NW
             else:
                 return SW
@@ -104,4 +112,10 @@ class QuadTree:
             self.root = QuadNode(self.region)
             
         return self.root.add(pt)
+    
+    def memoryUsage(self):
+        """Return bytes used by QuadTree, split into 'nodes', their 'regions' and 'children' lists."""
+        nodes = list(preorder(self.root))
+        return memoryUsage([('nodes', nodes), ('regions', (n.region for n in nodes)),
+                            ('children', (n.children for n in nodes))])
     
\ No newline at end of file
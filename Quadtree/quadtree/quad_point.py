@@ -17,22 +17,28 @@
 """
 
 from adk.region import X, Y, Region
-from quadtree.util import smaller2k, larger2k, containsPoint, NE, NW, SW, SE
+from quadtree.util import smaller2k, larger2k, containsPoint, NE, NW, SW, SE, NO_CHILDREN
+from quadtree.util import preorder, memoryUsage
 
 class QuadNode:
     
+    __slots__ = ('region', 'children', 'points')
+    
     def __init__(self, region, pt = None):
         """Create empty QuadNode centered on origin of given region."""
         self.region = region
-        self.origin = (region.x_min + (region.x_max - region.x_min)//2, 
-                       region.y_min + (region.y_max - region.y_min)//2) 
-        self.children = [None] * 4
+        self.children = NO_CHILDREN
         
         if pt:
             self.points = [pt]
         else:
             self.points = []
     
+    @property
+    def origin(self):
+        """Center of region, which splits node into its four quadrants."""
+        return (self.region.x_center, self.region.y_center)
+    
     def countChildren(self):
         """Count number of actual children nodes."""
         if self.children is None:
@@ -101,13 +107,13 @@ class QuadNode:
         """Create QuadNode associated with sub-quadrant for parent region."""
         r = self.region
         if quad == NE:
-            return QuadNode(Region(self.origin[X], self.origin[Y], r.x_max,        r.y_max))
+            return QuadNode(Region(r.x_center, r.y_center, r.x_max,    r.y_max))
         elif quad == NW:
-            return QuadNode(Region(r.x_min,        self.origin[Y], self.origin[X], r.y_max))
+            return QuadNode(Region(r.x_min,    r.y_center, r.x_center, r.y_max))
         elif quad == SW: 
-            return QuadNode(Region(r.x_min,        r.y_min,        self.origin[X], self.origin[Y]))
+            return QuadNode(Region(r.x_min,    r.y_min,    r.x_center, r.y_center))
         elif quad == SE:
-            return QuadNode(Region(self.origin[X], r.y_min,        r.x_max,        self.origin[Y]))
+            return QuadNode(Region(r.x_center, r.y_min,    r.x_max,    r.y_center))
         
     def subdivide(self):
         """Add up to four children nodes and reassign existing points."""
@@ -124,25 +130,20 @@ class QuadNode:
     
     def quadrant(self, pt):
         """Determine quadrant in which point exists."""
-        if pt[X] >= self.origin[X]:
-            if pt[Y] >= self.origin[Y]:
+        if pt[X] >= self.region.x_center:
+            if pt[Y] >= self.region.y_center:
                 return NE
             else:
                 return SE
         else:
-            if pt[Y] >= self.origin[Y]:
+            if pt[Y] >= self.region.y_center:
                 return NW
             else:
                 return SW
      
     def preorder(self):
         """Pre-order traversal of tree rooted at given node."""
-        yield self
-
-        for node in self.children:
-            if node:
-                for n in node.preorder():
-                    yield n
+        return preorder(self)
 
     def __str__(self):
         """toString representation."""
@@ -150,25 +151,32 @@ class QuadNode:
 
 class QuadTree:
 
-    def __init__(self, region):
+    def __init__(self, region, expand=False):
         """
         Create QuadTree defined over existing rectangular region. Assume that (0,0) is
         the lower left coordinate and the half-length side of any square in quadtree
         is power of 2. If incoming region is too small, this expands accordingly.    
+        When expand is True, points are never rejected: the region grows until it
+        contains each point that is added.
         """
         self.root = None
-        self.region = region.copy()
+        self.expand = expand
         
-        xmin2k = smaller2k(self.region.x_min)
-        ymin2k = smaller2k(self.region.y_min)
-        xmax2k = larger2k(self.region.x_max)
-        ymax2k = larger2k(self.region.y_max)
+        xmin2k = smaller2k(region.x_min)
+        ymin2k = smaller2k(region.y_min)
+        xmax2k = larger2k(region.x_max)
+        ymax2k = larger2k(region.y_max)
         
-        self.region.x_min = self.region.y_min = min(xmin2k, ymin2k)
-        self.region.x_max = self.region.y_max = max(xmax2k, ymax2k)
+        low = min(xmin2k, ymin2k)
+        high = max(xmax2k, ymax2k)
+        self.region = Region(low, low, high, high)
         
     def add(self, pt):
         """Add point to QuadTree."""
+        if self.expand:
+            while not containsPoint(self.region, pt):
+                self.grow(pt)
+        
         # Not able to fit in this tree
         if not containsPoint(self.region, pt):
             return False
@@ -179,6 +187,26 @@ class QuadTree:
         
         return self.root.add(pt)
     
+    def grow(self, pt):
+        """
+        Double the region of QuadTree, extending it towards pt. The existing root
+        becomes one quadrant of a new root, so no points are reinserted.
+        """
+        r = self.region
+        size = max(1, r.x_max - r.x_min)
+        x_min = r.x_min - size if pt[X] < r.x_min else r.x_min
+        y_min = r.y_min - size if pt[Y] < r.y_min else r.y_min
+        self.region = Region(x_min, y_min, x_min + 2*size, y_min + 2*size)
+        
+        if self.root is None:
+            return
+        
+        old = self.root
+        self.root = QuadNode(self.region)
+        self.root.points = None
+        self.root.children = [None] * 4
+        self.root.children[self.root.quadrant((old.region.x_min, old.region.y_min))] = old
+    
     def remove(self, pt):
         """Remove pt should it exist in tree."""
         if self.root is None:
@@ -204,9 +232,25 @@ class QuadTree:
     
     def __iter__(self):
         """Pre-order traversal of points in the tree."""
-        if self.root:
-            for node in self.root.preorder():
-                if node.points:
-                    for pt in node.points:
-                        yield pt
+        for node in preorder(self.root):
+            if node.points:
+                for pt in node.points:
+                    yield pt
+    
+    def memoryUsage(self):
+        """
+        Return bytes used by QuadTree, split into 'nodes', their 'regions', 'children'
+        lists and 'points' (with the lists storing them).
+        """
+        nodes = list(preorder(self.root))
+        
+        def points():
+            for node in nodes:
+                yield node.points
+                for pt in node.points or []:
+                    yield pt
+                    yield from pt
+        
+        return memoryUsage([('nodes', nodes), ('regions', (n.region for n in nodes)),
+                            ('children', (n.children for n in nodes)), ('points', points())])
         
@@ -22,19 +22,25 @@
 """
 
 from adk.region import X, Y, Region
-from quadtree.util import smaller2k, larger2k, containsPoint, NE, NW, SW, SE
+from quadtree.util import smaller2k, larger2k, containsPoint, NE, NW, SW, SE, NO_CHILDREN
+from quadtree.util import preorder, memoryUsage
 
 
 class QuadNode:
     
+    __slots__ = ('region', 'children', 'full')
+    
     def __init__(self, region, isFull = False):
         """Create empty QuadNode centered on origin of given region."""
         self.region = region
-        self.origin = (region.x_min + (region.x_max - region.x_min)//2, 
-                       region.y_min + (region.y_max - region.y_min)//2) 
-        self.children = [None] * 4
+        self.children = NO_CHILDREN
         self.full = isFull
        
+    @property
+    def origin(self):
+        """Center of region, which splits node into its four quadrants."""
+        return (self.region.x_center, self.region.y_center)
+    
     def isPoint(self):
         """
         Determine if associated region is a single point. Region is closed on min,
@@ -48,6 +54,8 @@ class QuadNode:
         # Find quadrant into which point is to be inserted and create if empty
         quad = self.quadrant(pt)
         
+        if self.children is NO_CHILDREN:
+            self.children = [None] * 4
         if self.children[quad] == None:
             self.children[quad] = QuadNode(self.subregion(quad))
             if self.children[quad].isPoint():
@@ -62,7 +70,7 @@ class QuadNode:
         # We have added pt to one of node's children. Perhaps we are full?
         if self.childrenFull():
             self.full = True
-            self.children = [None] * 4   
+            self.children = NO_CHILDREN
         
         return True
 
@@ -106,16 +114,17 @@ class QuadNode:
         """Return region associated with given quadrant."""
         r = self.region
         if quad is NE:
-            return Region(self.origin[X], self.origin[Y], r.x_max,        r.y_max)
+            return Region(r.x_center, r.y_center, r.x_max,    r.y_max)
         if quad is NW:
-            return Region(r.x_min,        self.origin[Y], self.origin[X], r.y_max)
+            return Region(r.x_min,    r.y_center, r.x_center, r.y_max)
         if quad is SW:
-            return Region(r.x_min,        r.y_min,        self.origin[X], self.origin[Y])
+            return Region(r.x_min,    r.y_min,    r.x_center, r.y_center)
         if quad is SE:
-            return Region(self.origin[X], r.y_min,        r.x_max,        self.origin[Y])
+            return Region(r.x_center, r.y_min,    r.x_max,    r.y_center)
     
     def subdivide(self):
         """Add four children nodes to node, retaining full status of parent."""
+        self.children = [None] * 4
         self.children[NE] = QuadNode(self.subregion(NE), self.full)
         self.children[NW] = QuadNode(self.subregion(NW), self.full)
         self.children[SW] = QuadNode(self.subregion(SW), self.full)
@@ -123,25 +132,20 @@ class QuadNode:
     
     def quadrant(self, pt):
         """Determine quadrant in which point exists."""
-        if pt[X] >= self.origin[X]:
-            if pt[Y] >= self.origin[Y]:
+        if pt[X] >= self.region.x_center:
+            if pt[Y] >= self.region.y_center:
                 return NE
             else:
                 return SE
         else:
-            if pt[Y] >= self.origin[Y]:
+            if pt[Y] >= self.region.y_center:
                 return NW
             else:
                 return SW
      
     def preorder(self):
         """Pre-order traversal of tree rooted at given node."""
-        yield self
-
-        for node in self.children:
-            if node:
-                for n in node.preorder():
-                    yield n
+        return preorder(self)
 
     def __str__(self):
         """toString representation."""
@@ -156,15 +160,15 @@ class QuadTree:
         is power of 2. If incoming region is too small, this expands accordingly.    
         """
         self.root = None
-        self.region = region.copy()
         
-        xmin2k = smaller2k(self.region.x_min)
-        ymin2k = smaller2k(self.region.y_min)
-        xmax2k = larger2k(self.region.x_max)
-        ymax2k = larger2k(self.region.y_max)
+        xmin2k = smaller2k(region.x_min)
+        ymin2k = smaller2k(region.y_min)
+        xmax2k = larger2k(region.x_max)
+        ymax2k = larger2k(region.y_max)
         
-        self.region.x_min = self.region.y_min = min(xmin2k, ymin2k)
-        self.region.x_max = self.region.y_max = max(xmax2k, ymax2k)
+        low = min(xmin2k, ymin2k)
+        high = max(xmax2k, ymax2k)
+        self.region = Region(low, low, high, high)
         
     def add(self, pt):
         """Add point to QuadTree. Return False if outside region or already exists."""
@@ -205,13 +209,21 @@ class QuadTree:
     
     def __iter__(self):
         """Pre-order traversal of elements in the tree."""
-        if self.root:
-            # This gives QUADNODES which we need to check for FULL status.
-            for node in self.root.preorder():
-                if node.full:
-                    # yield each pt in region, one at a time.
-                    for x in range(node.region.x_min, node.region.x_max):
-                        for y in range(node.region.y_min, node.region.y_max):
-                            yield (x,y)
-                elif node.isPoint():
-                    yield (node.region.x_min, node.region.y_min)
+        # This gives QUADNODES which we need to check for FULL status.
+        for node in preorder(self.root):
+            if node.full:
+                # yield each pt in region, one at a time.
+                for x in range(node.region.x_min, node.region.x_max):
+                    for y in range(node.region.y_min, node.region.y_max):
+                        yield (x,y)
+            elif node.isPoint():
+                yield (node.region.x_min, node.region.y_min)
+    
+    def memoryUsage(self):
+        """
+        Return bytes used by QuadTree, split into 'nodes', their 'regions' and 'children'
+        lists. Points are not stored, since full nodes represent every point in region.
+        """
+        nodes = list(preorder(self.root))
+        return memoryUsage([('nodes', nodes), ('regions', (n.region for n in nodes)),
+                            ('children', (n.children for n in nodes))])
@@ -2,6 +2,7 @@
 Utility functions for quadtrees.
 """
 import math
+import sys
 from adk.region import X, Y
 
 # Attributes for Circle
@@ -26,15 +27,53 @@ NW = 1
 SW = 2
 SE = 3
 
+# Shared children of every leaf node, so leaves need not allocate their own list.
+NO_CHILDREN = (None, None, None, None)
+
 # Associated tags for canvas items: LINES for quadtree structure, CIRCLES for circles
 LINE='line'
 
 
+def memoryUsage(parts):
+    """
+    Return dictionary with bytes used by each named collection of objects, in the 
+    (name, objects) pairs of parts, as measured by sys.getsizeof(), together with
+    their 'total'. Objects shared by several nodes (or collections) count once.
+    """
+    seen = set()
+    usage = {}
+    for name, objects in parts:
+        usage[name] = 0
+        for obj in objects:
+            if obj is not None and id(obj) not in seen:
+                seen.add(id(obj))
+                usage[name] += sys.getsizeof(obj)
+    usage['total'] = sum(usage.values())
+    return usage
+
 def distance(p, pt):
     """Compute distance from p to pt."""
     return ((p[X] - pt[X])**2 + (p[Y] - pt[Y])**2) ** 0.5
 
 
+def preorder(node, enter=None):
+    """
+    Yield nodes in subtree rooted at node in pre-order (NE, NW, SW, SE). Uses an
+    explicit stack, so each node costs the same regardless of its depth. When enter
+    is given, a node is only yielded (and its subtree explored) if enter(node) is True.
+    """
+    stack = [] if node is None else [node]
+    while stack:
+        node = stack.pop()
+        if enter is not None and not enter(node):
+            continue
+        yield node
+        
+        children = node.children
+        for quad in (SE, SW, NW, NE):
+            if children[quad] is not None:
+                stack.append(children[quad])
+
 def smaller2k(n):
     """
     Returns power of 2 which is smaller than n. Handles negative numbers.
@@ -73,6 +112,10 @@ def completelyContains(region, circle):
 
     return True
 
+def circleKey(circle):
+    """Return (x,y,radius) tuple that identifies circle within a quadtree."""
+    return (circle[X], circle[Y], circle[RADIUS])
+
 def listContainsCircle(collection, circle):
     """
     Check if (x,y,radius) of circle already in collection.
@@ -104,18 +147,19 @@ def deleteIfExists(collection, circle):
 
 def intersectsCircle(region, circle):
     """Returns True if circle intersects region, based on geometry. Be careful of open-ended regions."""
-    rectOrigin = [(region.x_min + region.x_max)//2, (region.y_min + region.y_max)//2]
-    halfSize   = [(region.x_max - region.x_min)//2, (region.y_max - region.y_min)//2]
-    distCenter = [abs(circle[X] - rectOrigin[X]), abs(circle[Y] - rectOrigin[Y])]
+    radius = circle[RADIUS]
+    dx = abs(circle[X] - region.x_center)
+    dy = abs(circle[Y] - region.y_center)
     
-    if distCenter[X] > circle[RADIUS] + halfSize[X] or distCenter[Y] > circle[RADIUS] + halfSize[Y]:
+    if dx > radius + region.x_half or dy > radius + region.y_half:
         return False 
-    if distCenter[X] <= halfSize[X] or distCenter[Y] <= halfSize[Y]:
+    if dx <= region.x_half or dy <= region.y_half:
         return True 
     
-    corner = [distCenter[X] - halfSize[X], distCenter[Y] - halfSize[Y]]
+    cx = dx - region.x_half
+    cy = dy - region.y_half
     
-    return (corner[X] ** 2 + corner[Y] ** 2) <= circle[RADIUS] ** 2
+    return (cx ** 2 + cy ** 2) <= radius ** 2
     # http://www.reddit.com/r/pygame/comments/2pxiha/rectanglar_circle_hit_detection
 
 def defaultCollision(c1, c2):
@@ -0,0 +1,129 @@
+import io
+import json
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+
+from benchmark import harness, frames
+from benchmark.__main__ import main
+from benchmark.workloads import WORKLOADS, generate
+from quadtree.quad import QuadTree
+from quadtree import quad_point, quad_region, quad0
+from adk.region import Region
+from quadtree.util import defaultCollision
+
+class TestBenchmarkMethods(unittest.TestCase):
+
+    def test_workloads(self):
+        for name in WORKLOADS:
+            region, circles, targets = generate(name, 100, seed=3, targets=10)
+            self.assertEqual(100, len(circles))
+            self.assertEqual(10, len(targets))
+            for c in circles + targets:
+                self.assertTrue(region.x_min <= c[0] <= region.x_max and region.y_min <= c[1] <= region.y_max)
+            self.assertEqual(circles, generate(name, 100, seed=3, targets=10)[1])
+            self.assertEqual(name == 'moving', all(c[5] or c[6] for c in circles))
+    
+    def test_skewedWorkloads(self):
+        for name in WORKLOADS:
+            region, circles, _ = generate(name, 300, seed=1)
+            circles = list({tuple(c[0:3]) : c for c in circles}.values())
+            expected = sum(1 for i in range(len(circles)) for j in range(i+1, len(circles)) 
+                           if defaultCollision(circles[i], circles[j]))
+            for looseness in [1, 2]:
+                qt = QuadTree.fromCircles(region, [list(c) for c in circles], looseness=looseness)
+                self.assertEqual(len(circles), len(qt))
+                self.assertEqual(expected, len(list(qt.allPairs())))
+    
+    def test_run(self):
+        document = harness.run(['naive.*', 'quad.collide'], ['uniform'], (50, 5000), repeat=1, targets=5)
+        json.dumps(document)
+        cases = [(r['case'], r['n']) for r in document['results']]
+        self.assertEqual([('naive.pairs', 50), ('naive.collide', 50), ('quad.collide', 50), 
+                          ('naive.collide', 5000), ('quad.collide', 5000)], cases)
+        
+        # results measured much faster in baseline regress; no overlap means no regression
+        baseline = json.loads(json.dumps(document))
+        for result in baseline['results']:
+            result['best'] /= 100
+        self.assertEqual(len(cases), len(harness.compare(document, baseline)))
+        self.assertEqual([], harness.compare(document, document))
+        baseline['results'] = []
+        self.assertEqual([], harness.compare(document, baseline))
+        baseline['format'] = 0
+        with self.assertRaises(ValueError):
+            harness.compare(document, baseline)
+    
+    def test_memory(self):
+        def circleTree(columnar):
+            return lambda circles: QuadTree.fromCircles(Region(0,0,1024,1024), circles, columnar=columnar)
+        def pointTree(cls):
+            def build(circles):
+                qt = cls(Region(0,0,1024,1024))
+                for pt in harness.points(circles):
+                    qt.add(pt)
+                return qt
+            return build
+        
+        for build in [circleTree(False), circleTree(True), pointTree(quad_point.QuadTree),
+                      pointTree(quad_region.QuadTree), pointTree(quad0.QuadTree)]:
+            small = build(generate('sparse', 100)[1]).memoryUsage()
+            usage = build(generate('sparse', 400)[1]).memoryUsage()
+            self.assertEqual(usage['total'], sum(v for k,v in usage.items() if k != 'total'))
+            self.assertTrue(0 < small['total'] < usage['total'])
+        
+        # snapshot has no index of circle locations
+        qt = QuadTree.fromCircles(*generate('sparse', 100)[0:2])
+        usage = qt.memoryUsage()
+        snapshot = qt.snapshot().memoryUsage()
+        self.assertEqual(0, snapshot['index'])
+        self.assertEqual(usage['total'] - usage['index'], snapshot['total'])
+        
+        # an aligned 4x4 block of points collapses into a single full node
+        block = quad_region.QuadTree(Region(0,0,16,16))
+        scattered = quad_region.QuadTree(Region(0,0,16,16))
+        for x in range(4):
+            for y in range(4):
+                block.add((x+4, y+8))
+                scattered.add((3*x+1, 3*y+2))
+        self.assertEqual(1, sum(1 for node in block.root.preorder() if node.full))
+        self.assertTrue(block.memoryUsage()['total'] < scattered.memoryUsage()['total'])
+    
+    def test_frames(self):
+        results = frames.run(workloads=['moving'], sizes=(150,), frames=12, seed=2)['results']
+        self.assertEqual(list(frames.STRATEGIES), [r['strategy'] for r in results])
+        for result in results:
+            self.assertEqual(150, result['circles'])
+            self.assertEqual(results[0]['pairs'], result['pairs'])
+            for phase in result['phases'].values():
+                self.assertTrue(0 <= phase['p50'] <= phase['p99'])
+        
+        # At this size, moving circles one at a time loses some as they swap places
+        outcomes = set()
+        for name, (strategy, _) in frames.STRATEGIES.items():
+            region, circles, _ = generate('moving', 500, seed=2)
+            scene = strategy(region, circles)
+            for _ in range(60):
+                scene.maintain(frames.integrate(circles, region))
+            held = len(scene.tree) if hasattr(scene, 'tree') else len(circles)
+            pairs = frozenset(frozenset((tuple(c1[0:3]), tuple(c2[0:3]))) for c1, c2 in scene.collide())
+            outcomes.add((held, pairs))
+        self.assertEqual(1, len(outcomes))
+        self.assertEqual(500, outcomes.pop()[0])
+        self.assertEqual(3, frames.percentile([5, 1, 3, 2, 4], 0.5))
+        self.assertEqual(5, frames.percentile([5, 1, 3, 2, 4], 0.99))
+    
+    def test_main(self):
+        path = os.path.join(tempfile.mkdtemp(), 'results.json')
+        args = ['--case', 'quad_point.*', '--sizes', '64', '--repeat', '1', '--targets', '8']
+        with redirect_stdout(io.StringIO()):
+            self.assertEqual(0, main(args + ['--output', path]))
+            self.assertEqual(len(WORKLOADS) * 2, len(harness.load(path)['results']))
+            self.assertEqual(0, main(args + ['--baseline', path, '--tolerance', '1000']))
+            self.assertEqual(1, main(args + ['--baseline', path, '--tolerance', '-1']))
+        os.remove(path)
+        os.rmdir(os.path.dirname(path))
+    
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+import os
+import tempfile
+import unittest
+
+from quadtree.quad import QuadTree
+from quadtree.util import defaultCollision
+from quadtree.broadphase import Broadphase, METHODS, gridPairs
+from benchmark.workloads import WORKLOADS, generate
+from benchmark.calibrate import calibrate
+
+def distinct(circles):
+    """Remove identical circles, which QuadTree would only keep once."""
+    return list({tuple(c[0:3]) : c for c in circles}.values())
+
+def pairKeys(pairs):
+    """Order-independent description of pairs."""
+    return sorted(tuple(sorted((tuple(c1[0:3]), tuple(c2[0:3])))) for c1, c2 in pairs)
+
+class TestBroadphaseMethods(unittest.TestCase):
+
+    def test_methods(self):
+        for name in WORKLOADS:
+            circles = distinct(generate(name, 250, seed=4)[1])
+            expected = pairKeys(METHODS['naive'](circles))
+            for method in METHODS.values():
+                self.assertEqual(expected, pairKeys(method(circles)))
+            for cellSize in [1, 7.5, 1000]:
+                self.assertEqual(expected, pairKeys(gridPairs(circles, cellSize)))
+        
+        for method in METHODS.values():
+            self.assertEqual([], list(method([])))
+    
+    def test_duplicates(self):
+        circles = generate('powerlaw', 200, seed=5)[1]
+        circles = circles + [list(c) for c in circles[:30]]
+        plain = [tuple(c[0:3]) for c in circles]
+        before = [list(c) for c in circles]
+        expected = pairKeys(METHODS['naive'](circles))
+        for name, method in METHODS.items():
+            self.assertEqual(expected, pairKeys(method(circles)))
+            self.assertEqual(expected, pairKeys(method(plain)))
+            self.assertEqual(expected, pairKeys(Broadphase({'naive': 0, 'columnar': 0, 'spread': 0}).pairs(plain)))
+            found = list(method(circles))
+            self.assertTrue(all(any(c1 is c for c in circles) and any(c2 is c for c in circles) for c1, c2 in found))
+        self.assertEqual(before, circles)
+    
+    def test_replacedCollision(self):
+        circles = distinct(generate('sparse', 200, seed=6)[1])
+        QuadTree.collision = lambda c1, c2: (c1[0]-c2[0])**2 + (c1[1]-c2[1])**2 <= 100
+        try:
+            expected = pairKeys(METHODS['naive'](circles))
+            for method in METHODS.values():
+                self.assertEqual(expected, pairKeys(method(circles)))
+        finally:
+            QuadTree.collision = defaultCollision
+    
+    def test_choose(self):
+        planner = Broadphase()
+        self.assertEqual('naive', planner.choose(distinct(generate('sparse', 5)[1])))
+        self.assertEqual('columnar', planner.choose(distinct(generate('sparse', 12)[1])))
+        self.assertEqual('grid', planner.choose(distinct(generate('sparse', 1000)[1])))
+        self.assertEqual('quadtree', planner.choose(distinct(generate('powerlaw', 1000)[1])))
+        for seed in range(10):
+            self.assertEqual('quadtree', planner.choose(generate('powerlaw', 2048, seed)[1]))
+        
+        # A few large outliers must not make a sparse scene look dense
+        circles = generate('sparse', 2048)[1] + [[100, 100, 300, False, False]]
+        self.assertEqual('quadtree', planner.choose(circles))
+        
+        dense = [[x, y, 40, False, False] for x in range(0, 100, 4) for y in range(0, 100, 4)]
+        self.assertEqual('columnar', planner.choose(dense))
+        self.assertEqual(pairKeys(METHODS['naive'](dense)), pairKeys(planner.pairs(dense)))
+        
+        planner = Broadphase({'naive': 10000})
+        self.assertEqual('naive', planner.choose(distinct(generate('sparse', 1000)[1])))
+    
+    def test_calibrate(self):
+        thresholds = calibrate(largest=32, repeat=1)
+        self.assertEqual(sorted(Broadphase().thresholds), sorted(thresholds))
+        self.assertTrue(thresholds['naive'] <= thresholds['columnar'] <= 32)
+        
+        path = os.path.join(tempfile.mkdtemp(), 'broadphase.json')
+        Broadphase(thresholds).save(path)
+        self.assertEqual(thresholds, Broadphase.load(path).thresholds)
+        os.remove(path)
+        os.rmdir(os.path.dirname(path))
+    
+if __name__ == '__main__':
+    unittest.main()
@@ -61,6 +61,16 @@ class TestCollisionMethods(unittest.TestCase):
         self.assertFalse (intersectsCircle(r, [26, 10, 2]))  # miss to right
         self.assertFalse (intersectsCircle(r, [14, 23, 2]))  # miss to top
         self.assertFalse (intersectsCircle(r, [14, 7, 2]))   # miss to bottom
+    
+    def test_regionGeometry(self):
+        """Center and half-size are computed once, regardless of corner order."""
+        r = Region(20, 20, 10, 10)
+        
+        self.assertEqual ((15, 15, 5, 5), (r.x_center, r.y_center, r.x_half, r.y_half))
+        self.assertEqual (Region(10, 10, 20, 20), r)
+        self.assertNotEqual (Region(10, 10, 20, 21), r)
+        with self.assertRaises(AttributeError):
+            r.extra = 1
        
 if __name__ == '__main__':
     unittest.main()    
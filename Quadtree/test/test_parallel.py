@@ -0,0 +1,71 @@
+import random
+import unittest
+from multiprocessing import shared_memory
+
+from quadtree.quad import QuadTree
+from quadtree import parallel
+from quadtree.parallel import ParallelQuery
+from adk.region import Region
+
+class TestParallelMethods(unittest.TestCase):
+
+    def test_collideMany(self):
+        circles = [[random.randint(0,512), random.randint(0,512), random.randint(1,12), False, False] for _ in range(300)]
+        targets = [(random.randint(0,512), random.randint(0,512), random.randint(1,20)) for _ in range(100)]
+        qt = QuadTree.fromCircles(Region(0,0,512,512), circles, looseness=2)
+        
+        indices, found = qt.collideMany(targets)
+        expected = sorted((indices[k], found[k][0:3]) for k in range(len(found)))
+        
+        with ParallelQuery(qt, workers=2) as pq:
+            indices, found = pq.collideMany(targets, shardSize=7)
+            self.assertEqual(expected, sorted((indices[k], found[k][0:3]) for k in range(len(found))))
+            self.assertEqual(sorted(indices), list(indices))
+            
+            # Circles returned are those stored in the tree
+            for c in found:
+                self.assertTrue(any(c is s for s in qt))
+            
+            self.assertEqual(list(indices), list(pq.collideMany(targets)[0]))
+            self.assertEqual(0, len(pq.collideMany([])[0]))
+    
+    def test_fractionBits(self):
+        circles = [[random.uniform(0,8), random.uniform(0,8), random.uniform(0.01,0.2), False, False] for _ in range(300)]
+        targets = [(random.uniform(0,8), random.uniform(0,8), random.uniform(0.01,0.3)) for _ in range(50)]
+        qt = QuadTree.fromCircles(Region(0,0,8,8), circles, fractionBits=8)
+        
+        indices, found = qt.collideMany(targets)
+        expected = sorted((indices[k], found[k][0:3]) for k in range(len(found)))
+        with ParallelQuery(qt, workers=2) as pq:
+            indices, found = pq.collideMany(targets)
+            self.assertEqual(expected, sorted((indices[k], found[k][0:3]) for k in range(len(found))))
+    
+    def test_empty(self):
+        with ParallelQuery(QuadTree(Region(0,0,512,512)), workers=1) as pq:
+            indices, found = pq.collideMany([(10, 10, 5)])
+            self.assertEqual(0, len(indices))
+            self.assertEqual([], found)
+    
+    def test_failedStart(self):
+        created = []
+        original = shared_memory.SharedMemory
+        class RecordingMemory(original):
+            def __init__(self, *args, **kwargs):
+                original.__init__(self, *args, **kwargs)
+                created.append(self.name)
+        
+        parallel.shared_memory.SharedMemory = RecordingMemory
+        try:
+            qt = QuadTree.fromCircles(Region(0,0,512,512), [[10, 10, 5, False, False]])
+            with self.assertRaises(ValueError):
+                ParallelQuery(qt, workers=-1)
+        finally:
+            parallel.shared_memory.SharedMemory = original
+        
+        # Shared memory published before the pool failed has been released
+        self.assertEqual(1, len(created))
+        with self.assertRaises(FileNotFoundError):
+            shared_memory.SharedMemory(name=created[0])
+    
+if __name__ == '__main__':
+    unittest.main()
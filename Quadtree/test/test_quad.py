@@ -1,6 +1,10 @@
+import os
+import random
+import tempfile
 import unittest
 
-from quadtree.quad import QuadTree
+from quadtree.quad import QuadTree, recommendCapacity
+from quadtree.util import defaultCollision
 from adk.region import Region
 
 class TestQuadMethods(unittest.TestCase):
@@ -49,11 +53,611 @@ class TestQuadMethods(unittest.TestCase):
         
         self.assertTrue(self.qt.remove([13, 59, 20]))
     
+    def test_remove_collapse(self):
+        qt = QuadTree(Region(0,0,512,512))
+        circles = []
+        for _ in range(300):
+            circle = [random.randint(0,512), random.randint(0,512), random.randint(1,12), False, False]
+            if qt.add(circle):
+                circles.append(circle)
+        
+        random.shuffle(circles)
+        while len(circles) > 10:
+            self.assertTrue(qt.remove(circles.pop()))
+            if len(circles) % 50 == 0:
+                bulk = QuadTree.fromCircles(Region(0,0,512,512), [list(c) for c in circles])
+                self.assertEqual(self.sortedStructure(bulk), self.sortedStructure(qt))
+        
+        while circles:
+            self.assertTrue(qt.remove(circles.pop()))
+        self.assertTrue(qt.root.isLeaf())
+        self.assertEqual(0, len(qt))
+    
+    def test_locations(self):
+        for columnar in [False, True]:
+            qt = QuadTree(Region(0,0,512,512), columnar)
+            circles = []
+            for _ in range(400):
+                circle = [random.randint(0,512), random.randint(0,512), random.randint(1,12), False, False]
+                self.assertEqual(circle in qt, not qt.add(circle))
+                circles.append(circle)
+            for circle in circles[::3]:
+                qt.remove(circle)
+            for circle in circles[1::3]:
+                qt.move(circle, circle[0] + random.randint(-20,20), circle[1] + random.randint(-20,20))
+            
+            self.assertEqual(len(qt), len(qt.locations))
+            for key, (node, idx) in qt.locations.items():
+                self.assertEqual(list(key), node.circles[idx][0:3])
+                if columnar:
+                    self.assertEqual(key, (node.xs[idx], node.ys[idx], node.rs[idx]))
+            for circle in circles:
+                self.assertEqual(circle in qt, any(c[0:3] == circle[0:3] for c in qt))
+    
     def test_iteration(self):
         ct = 0
         for _ in self.qt:
             ct += 1 
         self.assertEqual(5, ct)
     
+    def test_deepTraversal(self):
+        """Clustered circles produce deep tree; traversal order is unchanged."""
+        circles = []
+        for _ in range(200):
+            circles.append([random.randint(0,64), random.randint(0,64), random.randint(1,3), False, False])
+        
+        for columnar in [False, True]:
+            qt = QuadTree.fromCircles(Region(0,0,2**30,2**30), [list(c) for c in circles], columnar)
+            self.assertTrue(max(depth for depth, _ in self.depths(qt.root)) > 20)
+            self.assertEqual([node for _, node in self.depths(qt.root)], list(qt.root.preorder()))
+            
+            for _ in range(20):
+                target = [random.randint(0,64), random.randint(0,64), random.randint(1,10)]
+                expected = sorted(c[0:3] for c in qt if QuadTree.collision(c, target))
+                self.assertEqual(expected, sorted(c[0:3] for c in qt.collide(target)))
+    
+    def test_collideMany(self):
+        circles = [[random.randint(0,512), random.randint(0,512), random.randint(1,12), False, False] for _ in range(300)]
+        targets = [(random.randint(0,512), random.randint(0,512), random.randint(1,20)) for _ in range(100)]
+        
+        for looseness in [1, 2]:
+            qt = QuadTree.fromCircles(Region(0,0,512,512), [list(c) for c in circles], looseness=looseness)
+            expected = sorted((i, c[0:3]) for i in range(len(targets)) for c in qt.collide(targets[i]))
+            indices, found = qt.collideMany(targets)
+            self.assertEqual(len(indices), len(found))
+            self.assertEqual(expected, sorted((indices[k], found[k][0:3]) for k in range(len(found))))
+        
+        indices, found = QuadTree(Region(0,0,512,512)).collideMany(targets)
+        self.assertEqual(0, len(indices))
+        self.assertEqual([], found)
+    
+    def test_nearest(self):
+        circles = [[random.randint(0,512), random.randint(0,512), random.randint(1,40), False, False] for _ in range(300)]
+        
+        # Include circles that extend well past the boundary of the tree
+        circles.append([-30, 100, 40, False, False])
+        circles.append([256, 530, 25, False, False])
+        
+        for looseness in [1, 2]:
+            qt = QuadTree.fromCircles(Region(0,0,512,512), [list(c) for c in circles], looseness=looseness)
+            for _ in range(30):
+                pt = (random.randint(-100,612), random.randint(-100,612))
+                brute = sorted(max(0, ((c[0]-pt[0])**2 + (c[1]-pt[1])**2)**0.5 - c[2]) for c in qt)
+                
+                found = qt.nearest(pt, 5)
+                self.assertEqual(brute[:5], [d for d, _ in found])
+                for d, c in found:
+                    self.assertAlmostEqual(d, max(0, ((c[0]-pt[0])**2 + (c[1]-pt[1])**2)**0.5 - c[2]))
+                
+                within = qt.nearestWithin(pt, 50, 30)
+                self.assertEqual([d for d in brute if d <= 30][:50], [d for d, _ in within])
+        
+        self.assertEqual([], QuadTree(Region(0,0,512,512)).nearest((10, 10)))
+    
+    def test_queryRegion(self):
+        circles = [[random.randint(0,512), random.randint(0,512), random.randint(1,40), False, False] for _ in range(300)]
+        circles.append([-30, 100, 40, False, False])
+        circles.append([256, 530, 25, False, False])
+        
+        for looseness in [1, 2]:
+            qt = QuadTree.fromCircles(Region(0,0,512,512), [list(c) for c in circles], looseness=looseness)
+            queries = [Region(-100,-100,700,700), Region(-80,90,-5,110), Region(0,0,512,4)]
+            for _ in range(30):
+                queries.append(Region(random.randint(-50,550), random.randint(-50,550), random.randint(-50,550), random.randint(-50,550)))
+            
+            for r in queries:
+                expected = []
+                for c in qt:
+                    dx = max(r.x_min - c[0], 0, c[0] - r.x_max)
+                    dy = max(r.y_min - c[1], 0, c[1] - r.y_max)
+                    if dx*dx + dy*dy <= c[2]*c[2]:
+                        expected.append(c[0:3])
+                self.assertEqual(sorted(expected), sorted(c[0:3] for c in qt.queryRegion(r)))
+                self.assertEqual(len(expected), qt.countRegion(r))
+        
+        self.assertEqual(0, QuadTree(Region(0,0,512,512)).countRegion(Region(0,0,10,10)))
+    
+    def test_collideSwept(self):
+        qt = QuadTree(Region(0,0,512,512))
+        qt.add([100, 100, 2, False, False])
+        
+        # End points miss the thin target, but the path does not
+        self.assertEqual([], list(qt.collide([90, 100, 3])))
+        self.assertEqual([], list(qt.collide([110, 100, 3])))
+        hits = qt.collideSwept([90, 100, 3], 20, 0)
+        self.assertEqual(1, len(hits))
+        self.assertAlmostEqual(0.25, hits[0][0])
+        self.assertEqual([], qt.collideSwept([90, 110, 3], 20, 0))
+        
+        circles = [[random.randint(0,512), random.randint(0,512), random.randint(1,12), False, False] for _ in range(300)]
+        for looseness in [1, 2]:
+            qt = QuadTree.fromCircles(Region(0,0,512,512), [list(c) for c in circles], looseness=looseness)
+            for _ in range(30):
+                mover = [random.randint(0,512), random.randint(0,512), random.randint(1,8)]
+                dx, dy = random.randint(-100,100), random.randint(-100,100)
+                
+                # Hit when center of c is close enough to path of mover
+                expected = []
+                for c in qt:
+                    t = ((c[0] - mover[0])*dx + (c[1] - mover[1])*dy) / (dx*dx + dy*dy or 1)
+                    t = min(1, max(0, t))
+                    pos = [mover[0] + dx*t, mover[1] + dy*t, mover[2]]
+                    if QuadTree.collision(c, pos):
+                        expected.append(tuple(c[0:3]))
+                hits = qt.collideSwept(mover, dx, dy)
+                self.assertEqual(sorted(expected), sorted(tuple(c[0:3]) for _, c in hits))
+                self.assertEqual(sorted(t for t, _ in hits), [t for t, _ in hits])
+    
+    def test_expand(self):
+        circles = [[random.randint(-2000,2000), random.randint(-2000,2000), random.randint(1,30), False, False] for _ in range(300)]
+        
+        for looseness in [1, 2]:
+            qt = QuadTree(Region(0,0,64,64), looseness=looseness, expand=True)
+            first = None
+            for c in circles:
+                self.assertTrue(qt.add(list(c)))
+                if first is None:
+                    first = qt.root
+            
+            # Original root is still in use, now deep within tree
+            self.assertTrue(any(node is first for node in qt.root.preorder()))
+            self.assertEqual(len(circles), len(qt))
+            self.assertTrue(all(qt.fits(c) for c in circles))
+            pairs = [(i, j) for i in range(len(circles)) for j in range(i+1, len(circles)) if QuadTree.collision(circles[i], circles[j])]
+            self.assertEqual(len(pairs), len(list(qt.allPairs())))
+            
+            bulk = QuadTree.fromCircles(Region(0,0,64,64), [list(c) for c in circles], looseness=looseness, expand=True)
+            self.assertEqual(len(circles), len(bulk))
+            for _ in range(20):
+                target = [random.randint(-2500,2500), random.randint(-2500,2500), random.randint(4,200)]
+                expected = sorted(c[0:3] for c in circles if QuadTree.collision(c, target))
+                self.assertEqual(expected, sorted(c[0:3] for c in qt.collide(target)))
+                self.assertEqual(expected, sorted(c[0:3] for c in bulk.collide(target)))
+            
+            # Moving far outside grows tree rather than dropping circle
+            c = list(qt)[0]
+            self.assertTrue(qt.move(c, 9000, -9000))
+            self.assertTrue([9000, -9000, c[2]] in qt)
+        
+        self.assertFalse(QuadTree(Region(0,0,64,64)).add([100, 100, 2, False, False]))
+    
+    def test_fractionBits(self):
+        circles = [[random.uniform(0,8), random.uniform(0,8), random.uniform(0.01,0.1), False, False] for _ in range(400)]
+        circles.append([-0.05, 4.0, 0.1, False, False])
+        
+        coarse = QuadTree.fromCircles(Region(0,0,8,8), [list(c) for c in circles])
+        for looseness in [1, 2]:
+            for columnar in [False, True]:
+                qt = QuadTree(Region(0,0,8,8), columnar, looseness, fractionBits=10)
+                for c in circles:
+                    self.assertTrue(qt.add(list(c)))
+                
+                # Nodes now subdivide below unit size, so leaves stay small
+                largest = max(len(node.circles) for node in qt.root.preorder() if node.isLeaf())
+                self.assertTrue(largest <= 4)
+                self.assertTrue(largest < max(len(node.circles) for node in coarse.root.preorder()))
+                
+                bulk = QuadTree.fromCircles(Region(0,0,8,8), [list(c) for c in circles], columnar, looseness, fractionBits=10)
+                self.assertEqual(self.sortedStructure(qt), self.sortedStructure(bulk))
+                
+                for _ in range(20):
+                    target = [random.uniform(0,8), random.uniform(0,8), random.uniform(0.01,0.5)]
+                    expected = sorted(c[0:3] for c in circles if QuadTree.collision(c, target))
+                    self.assertEqual(expected, sorted(c[0:3] for c in qt.collide(target)))
+                    
+                    r = Region(random.uniform(-1,9), random.uniform(-1,9), random.uniform(-1,9), random.uniform(-1,9))
+                    expected = [c for c in circles if max(r.x_min - c[0], 0, c[0] - r.x_max)**2 + max(r.y_min - c[1], 0, c[1] - r.y_max)**2 <= c[2]**2]
+                    self.assertEqual(sorted(c[0:3] for c in expected), sorted(c[0:3] for c in qt.queryRegion(r)))
+                    self.assertEqual(len(expected), qt.countRegion(r))
+                    
+                    pt = (random.uniform(-1,9), random.uniform(-1,9))
+                    brute = sorted(max(0, ((c[0]-pt[0])**2 + (c[1]-pt[1])**2)**0.5 - c[2]) for c in circles)
+                    self.assertEqual(brute[:3], [d for d, _ in qt.nearest(pt, 3)])
+                
+                pairs = [(i, j) for i in range(len(circles)) for j in range(i+1, len(circles)) if QuadTree.collision(circles[i], circles[j])]
+                self.assertEqual(len(pairs), len(list(qt.allPairs())))
+                
+                for c in list(qt):
+                    x = min(7.8, max(0.2, c[0] + random.uniform(-0.2,0.2)))
+                    y = min(7.8, max(0.2, c[1] + random.uniform(-0.2,0.2)))
+                    self.assertTrue(qt.move(c, x, y))
+                for c in list(qt):
+                    self.assertTrue(qt.remove(c))
+                self.assertEqual(0, len(qt))
+        
+        with self.assertRaises(ValueError):
+            QuadTree(Region(0,0,8,8), fractionBits=-1)
+    
+    def test_columnar(self):
+        qt = QuadTree(Region(0,0,512,512))
+        cqt = QuadTree(Region(0,0,512,512), columnar=True)
+        for _ in range(200):
+            circle = [random.randint(0,512), random.randint(0,512), random.randint(4,20), False, False]
+            qt.add(circle)
+            cqt.add(list(circle))
+        
+        for _ in range(50):
+            target = [random.randint(0,512), random.randint(0,512), random.randint(4,20)]
+            expected = sorted(c[0:3] for c in qt.collide(target))
+            self.assertEqual(expected, sorted(c[0:3] for c in cqt.collide(target)))
+        
+        # removal keeps columns aligned with circles
+        for c in list(cqt)[::2]:
+            self.assertTrue(qt.remove(c))
+            self.assertTrue(cqt.remove(c))
+        for c in qt:
+            expected = sorted(s[0:3] for s in qt.collide(c))
+            self.assertEqual(expected, sorted(s[0:3] for s in cqt.collide(c)))
+    
+    def structure(self, qt):
+        """Capture regions, circles and MULTIPLE flags of nodes in preorder."""
+        result = []
+        for node in qt.root.preorder():
+            result.append((str(node.region), node.isLeaf(), [c[0:5] for c in node.circles]))
+        return result
+    
+    def test_fromCircles(self):
+        circles = []
+        for _ in range(500):
+            circles.append([random.randint(0,512), random.randint(0,512), random.randint(4,30), False, False])
+        circles.append(list(circles[0]))        # duplicate is ignored
+        circles.append([2000, 2000, 10, False, False])
+        
+        qt = QuadTree(Region(0,0,512,512))
+        for c in circles:
+            qt.add(list(c))
+        bulk = QuadTree.fromCircles(Region(0,0,512,512), [list(c) for c in circles])
+        
+        self.assertEqual(self.structure(qt), self.structure(bulk))
+        self.assertEqual(len(set(tuple(c[0:3]) for c in circles[:500])), len(list(bulk)))
+        self.assertIsNone(QuadTree.fromCircles(Region(0,0,512,512), []).root)
+    
+    def sortedStructure(self, qt):
+        """Capture regions and circles of nodes in preorder, ignoring order within node."""
+        result = []
+        for node in qt.root.preorder():
+            result.append((str(node.region), node.isLeaf(), sorted(c[0:5] for c in node.circles)))
+        return result
+    
+    def test_replacedCollision(self):
+        # collision only between circles whose centers are within 5 units
+        circles = [[random.randint(0,512), random.randint(0,512), random.randint(4,20), False, False] for _ in range(300)]
+        plain = QuadTree.fromCircles(Region(0,0,512,512), [list(c) for c in circles])
+        columnar = QuadTree.fromCircles(Region(0,0,512,512), [list(c) for c in circles], columnar=True)
+        path = os.path.join(tempfile.mkdtemp(), 'tree.qt')
+        plain.save(path)
+        mapped = QuadTree.openMmap(path)
+        QuadTree.collision = lambda c1, c2: (c1[0]-c2[0])**2 + (c1[1]-c2[1])**2 <= 25
+        try:
+            for target in circles[:50]:
+                expected = sorted(c[0:3] for c in plain.collide(target))
+                self.assertEqual(expected, sorted(c[0:3] for c in columnar.collide(target)))
+                self.assertEqual(expected, sorted(c[0:3] for c in mapped.collide(target)))
+                self.assertTrue(all((c[0]-target[0])**2 + (c[1]-target[1])**2 <= 25 for c in expected))
+        finally:
+            QuadTree.collision = defaultCollision
+            mapped.close()
+            os.remove(path)
+            os.rmdir(os.path.dirname(path))
+    
+    def test_update(self):
+        # every circle steps onto location of the next one, which moves on as well
+        qt = QuadTree(Region(0,0,512,512))
+        circles = [[10*i + 20, 100, 4, False, False] for i in range(40)]
+        for c in circles:
+            qt.add(c)
+        self.assertEqual([], qt.update([(c, c[0] + 10, c[1]) for c in circles]))
+        self.assertEqual(40, len(qt))
+        for c in circles:
+            self.assertTrue(c in qt)
+        self.assertEqual(sorted(10*i + 30 for i in range(40)), sorted(c[0] for c in qt))
+        
+        # circles landing on same location, or outside tree, are no longer present
+        dropped = qt.update([(circles[0], 200, 200), (circles[1], 200, 200), (circles[2], 900, 900)])
+        self.assertEqual(2, len(dropped))
+        self.assertEqual(38, len(qt))
+        remaining = [c for c in circles if all(c is not d for d in dropped)]
+        self.assertEqual(len(remaining), len(qt))
+        self.assertEqual(sorted(map(id, remaining)), sorted(map(id, qt)))
+    
+    def test_move(self):
+        circles = []
+        for _ in range(300):
+            circles.append([random.randint(20,492), random.randint(20,492), random.randint(4,20), False, False])
+        qt = QuadTree.fromCircles(Region(0,0,512,512), circles, columnar=True)
+        circles = list(qt)
+        
+        for _ in range(5):
+            for c in circles:
+                if c in qt:
+                    qt.move(c, c[0] + random.randint(-8,8), c[1] + random.randint(-8,8))
+            remaining = [list(c) for c in qt]
+            self.assertEqual(len(remaining), len(qt))
+            rebuilt = QuadTree.fromCircles(Region(0,0,512,512), remaining)
+            self.assertEqual(self.sortedStructure(rebuilt), self.sortedStructure(qt))
+        
+        # moving onto existing circle, or out of bounds, removes it
+        size = len(qt)
+        self.assertTrue(qt.add([100, 100, 3, False, False]))
+        self.assertTrue(qt.add([200, 200, 3, False, False]))
+        self.assertFalse(qt.move([100, 100, 3], 200, 200))
+        self.assertTrue([200, 200, 3] in qt)
+        self.assertFalse(qt.move([200, 200, 3], 5000, 5000))
+        self.assertEqual(size, len(qt))
+        self.assertFalse(qt.move([9999, 9999, 1], 10, 10))
+    
+    def test_allPairs(self):
+        circles = []
+        for _ in range(300):
+            circles.append([random.randint(0,512), random.randint(0,512), random.randint(4,40), False, False])
+        qt = QuadTree.fromCircles(Region(0,0,512,512), circles)
+        circles = list(qt)
+        
+        expected = set()
+        for i in range(len(circles)):
+            for j in range(i+1, len(circles)):
+                if QuadTree.collision(circles[i], circles[j]):
+                    expected.add(frozenset([tuple(circles[i][0:3]), tuple(circles[j][0:3])]))
+        
+        pairs = [frozenset([tuple(a[0:3]), tuple(b[0:3])]) for a,b in qt.allPairs()]
+        self.assertEqual(len(expected), len(pairs))
+        self.assertEqual(expected, set(pairs))
+        self.assertEqual([], list(QuadTree(Region(0,0,512,512)).allPairs()))
+    
+    def test_loose(self):
+        circles = []
+        for _ in range(400):
+            circles.append([random.randint(0,512), random.randint(0,512), random.randint(2,60), False, False])
+        qt = QuadTree.fromCircles(Region(0,0,512,512), circles)
+        loose = QuadTree(Region(0,0,512,512), looseness=2)
+        for c in circles:
+            loose.add(list(c))
+        self.assertEqual(len(qt), len(loose))
+        self.assertTrue(len(loose.root.circles) < len(qt.root.circles))
+        
+        for _ in range(50):
+            target = [random.randint(0,512), random.randint(0,512), random.randint(4,20)]
+            expected = sorted(c[0:3] for c in qt.collide(target))
+            self.assertEqual(expected, sorted(c[0:3] for c in loose.collide(target)))
+        self.assertEqual(len(list(qt.allPairs())), len(list(loose.allPairs())))
+        
+        bulk = QuadTree.fromCircles(Region(0,0,512,512), [list(c) for c in loose], looseness=2)
+        self.assertEqual(self.sortedStructure(loose), self.sortedStructure(bulk))
+        
+        for c in list(loose):
+            self.assertTrue(c in loose)
+            size = len(loose)
+            if not loose.move(c, c[0] + random.randint(-8,8), c[1] + random.randint(-8,8)):
+                size -= 1
+            self.assertEqual(size, len(loose))
+        bulk = QuadTree.fromCircles(Region(0,0,512,512), [list(c) for c in loose], looseness=2)
+        self.assertEqual(self.sortedStructure(loose), self.sortedStructure(bulk))
+        
+        for c in list(loose):
+            self.assertTrue(loose.remove(c))
+        self.assertEqual(0, len(loose))
+    
+    def depths(self, node, depth=0):
+        """Yield (depth, node) for all nodes in subtree."""
+        yield (depth, node)
+        for child in node.children:
+            if child is not None:
+                yield from self.depths(child, depth+1)
+    
+    def test_capacity(self):
+        circles = []
+        for _ in range(300):
+            circles.append([random.randint(0,512), random.randint(0,512), random.randint(1,6), False, False])
+        qt = QuadTree.fromCircles(Region(0,0,512,512), circles)
+        
+        for capacity, maxDepth in [(1, None), (8, None), (4, 2), (16, 3)]:
+            tree = QuadTree(Region(0,0,512,512), capacity=capacity, maxDepth=maxDepth)
+            for c in circles:
+                tree.add(list(c))
+            self.assertEqual(len(qt), len(tree))
+            for depth, node in self.depths(tree.root):
+                if maxDepth is not None:
+                    self.assertTrue(depth <= maxDepth)
+                if node.isLeaf() and (maxDepth is None or depth < maxDepth):
+                    self.assertTrue(len(node.circles) <= capacity)
+            
+            bulk = QuadTree.fromCircles(Region(0,0,512,512), [list(c) for c in circles], capacity=capacity, maxDepth=maxDepth)
+            self.assertEqual(self.sortedStructure(tree), self.sortedStructure(bulk))
+            
+            for _ in range(20):
+                target = [random.randint(0,512), random.randint(0,512), random.randint(4,20)]
+                expected = sorted(c[0:3] for c in qt.collide(target))
+                self.assertEqual(expected, sorted(c[0:3] for c in tree.collide(target)))
+            self.assertEqual(len(list(qt.allPairs())), len(list(tree.allPairs())))
+            
+            for c in list(tree):
+                tree.move(c, c[0] + random.randint(-8,8), c[1] + random.randint(-8,8))
+            bulk = QuadTree.fromCircles(Region(0,0,512,512), [list(c) for c in tree], capacity=capacity, maxDepth=maxDepth)
+            self.assertEqual(self.sortedStructure(tree), self.sortedStructure(bulk))
+        
+        with self.assertRaises(ValueError):
+            QuadTree(Region(0,0,512,512), capacity=0)
+    
+    def test_recommendCapacity(self):
+        circles = [[random.randint(0,512), random.randint(0,512), 4, False, False] for _ in range(200)]
+        targets = [[random.randint(0,512), random.randint(0,512), 8] for _ in range(50)]
+        best, timings = recommendCapacity(Region(0,0,512,512), circles, targets, (2, 4, 8))
+        self.assertTrue(best in (2, 4, 8))
+        self.assertEqual([2, 4, 8], sorted(timings))
+    
+    def test_snapshot(self):
+        for columnar in [False, True]:
+            tree = QuadTree(Region(0,0,512,512), columnar=columnar, capacity=4)
+            for _ in range(300):
+                tree.add([random.randint(0,512), random.randint(0,512), random.randint(2,8), False, False])
+            before = sorted(c[0:3] for c in tree)
+            snap = tree.snapshot()
+            with self.assertRaises(TypeError):
+                snap.add([1, 1, 1, False, False])
+            
+            # unchanged subtrees are shared rather than copied
+            tree.add([5, 5, 2, False, False])
+            shared = set(map(id, tree.root.preorder())) & set(map(id, snap.root.preorder()))
+            self.assertTrue(len(shared) > 0)
+            
+            circles = list(tree)
+            for c in circles[:100]:
+                tree.remove(c)
+            for c in list(tree)[:100]:
+                tree.move(c, random.randint(0,512), random.randint(0,512))
+            for _ in range(100):
+                tree.add([random.randint(0,512), random.randint(0,512), random.randint(2,8), False, False])
+            
+            self.assertEqual(len(before), len(snap))
+            self.assertEqual(before, sorted(c[0:3] for c in snap))
+            for c in before:
+                self.assertTrue(c in snap)
+            
+            live = [c[0:3] for c in tree]
+            self.assertEqual(len(live), len(tree))
+            for _ in range(30):
+                target = [random.randint(0,512), random.randint(0,512), random.randint(4,20)]
+                hits = lambda circles: sorted(c for c in circles
+                                              if (c[0]-target[0])**2 + (c[1]-target[1])**2 <= (c[2]+target[2])**2)
+                self.assertEqual(hits(before), sorted(c[0:3] for c in snap.collide(target)))
+                self.assertEqual(hits(live), sorted(c[0:3] for c in tree.collide(target)))
+                
+            # circles held by caller remain those in other once shared subtrees collapse
+            other = QuadTree(Region(0,0,512,512), columnar=columnar)
+            circles = [[random.randint(0,512), random.randint(0,512), random.randint(2,8), False, False] for _ in range(40)]
+            circles = [c for c in circles if other.add(c)]
+            collapsed = other.snapshot()
+            for c in circles[4:]:
+                self.assertTrue(other.remove(c))
+            self.assertEqual(len(circles), len(collapsed))
+            for c in circles[:4]:
+                self.assertTrue(any(c is t for t in other))
+                if other.move(c, c[0] + 1, c[1]):
+                    self.assertTrue(c in other)
+                    self.assertTrue(other.remove(c))
+            self.assertEqual(0, len(other))
+            
+            # growing the tree leaves the root of snapshot without a parent
+            grown = QuadTree(Region(0,0,64,64), columnar=columnar, expand=True)
+            for _ in range(30):
+                grown.add([random.randint(0,64), random.randint(0,64), random.randint(2,8), False, False])
+            small = grown.snapshot()
+            kept = sorted(c[0:3] for c in small)
+            for _ in range(5):
+                grown.add([random.randint(-500,500), random.randint(-500,500), random.randint(2,8), False, False])
+            self.assertTrue(grown.root.region.x_max - grown.root.region.x_min > 64)
+            self.assertIsNone(small.root.parent)
+            self.assertEqual(kept, sorted(c[0:3] for c in small))
+            for _ in range(30):
+                pt = (random.randint(-20,80), random.randint(-20,80))
+                expected = sorted(max(0, ((c[0]-pt[0])**2 + (c[1]-pt[1])**2) ** 0.5 - c[2]) for c in kept)
+                self.assertEqual(expected[:3], [d for d, _ in small.nearest(pt, 3)])
+            
+            # a later snapshot is independent of the earlier one
+            again = tree.snapshot()
+            tree.move(list(tree)[0], 256, 256)
+            self.assertEqual(sorted(live), sorted(c[0:3] for c in again))
+            self.assertEqual(before, sorted(c[0:3] for c in snap))
+    
+    def test_instrument(self):
+        for columnar in [False, True]:
+            tree = QuadTree(Region(0,0,512,512), columnar=columnar)
+            circles = [[random.randint(0,512), random.randint(0,512), random.randint(2,8), False, False] for _ in range(200)]
+            for c in circles:
+                tree.add(c)
+            
+            report = tree.stats()
+            self.assertFalse('queries' in report)
+            self.assertEqual(len(tree), report['circles'])
+            self.assertEqual(report['leaves'], sum(report['occupancy'].values()))
+            self.assertEqual(report['nodes'], sum(report['depths'].values()))
+            self.assertEqual(len(tree), report['multiple'] + sum(k*v for k,v in report['occupancy'].items()))
+            self.assertEqual(report['multiple'], sum(1 for c in tree if c[4]))
+            
+            tree.instrument()
+            total = 0
+            for target in circles[:50]:
+                total += len(list(tree.collide(target)))
+            report = tree.stats()
+            self.assertEqual(50, report['queries'])
+            self.assertEqual(total, report['results'])
+            self.assertTrue(report['results'] <= report['collisions'] < 50 * len(tree))
+            self.assertTrue(report['nodes'] <= report['intersects'])
+            self.assertTrue(0 < report['pruning'] < 1)
+            
+            counters = dict(tree.counters)
+            snap = tree.snapshot()
+            for target in circles[:10]:
+                list(snap.collide(target))
+            self.assertEqual(counters, tree.counters)
+            self.assertFalse('queries' in snap.stats())
+            
+            tree.instrument(False)
+            self.assertEqual(total, sum(len(list(tree.collide(t))) for t in circles[:50]))
+            self.assertFalse('pruning' in tree.stats())
+        
+        self.assertEqual(0, QuadTree(Region(0,0,64,64)).stats()['nodes'])
+    
+    def test_openMmap(self):
+        path = os.path.join(tempfile.mkdtemp(), 'tree.qt')
+        for looseness, fractionBits, maxDepth in [(1, 0, None), (2, 0, None), (1, 2, 3), (2, 3, None)]:
+            tree = QuadTree(Region(0,0,256,256), looseness=looseness, maxDepth=maxDepth, fractionBits=fractionBits)
+            for _ in range(400):
+                tree.add([random.uniform(-4,260), random.uniform(-4,260), random.uniform(0.5,12), False, False])
+            tree.save(path)
+            
+            with QuadTree.openMmap(path) as mapped:
+                self.assertEqual(len(tree), len(mapped))
+                self.assertEqual([c[0:3] for c in tree], [c[0:3] for c in mapped])
+                self.assertEqual([c[4] for c in tree], [c[4] for c in mapped])
+                for c in list(tree)[:20]:
+                    self.assertTrue(c in mapped)
+                self.assertFalse([-50, -50, 1] in mapped)
+                
+                for _ in range(30):
+                    target = [random.uniform(0,256), random.uniform(0,256), random.uniform(1,20)]
+                    self.assertEqual(sorted(c[0:3] for c in tree.collide(target)), 
+                                     sorted(c[0:3] for c in mapped.collide(target)))
+                    
+                    x = random.uniform(-10,250)
+                    y = random.uniform(-10,250)
+                    region = Region(x, y, x + random.uniform(0,100), y + random.uniform(0,100))
+                    self.assertEqual(sorted(c[0:3] for c in tree.queryRegion(region)), 
+                                     sorted(c[0:3] for c in mapped.queryRegion(region)))
+                    self.assertEqual(tree.countRegion(region), mapped.countRegion(region))
+        
+        QuadTree(Region(0,0,64,64)).save(path)
+        with QuadTree.openMmap(path) as mapped:
+            self.assertEqual(0, len(mapped))
+            self.assertEqual([], list(mapped.collide([4, 4, 4])))
+            self.assertEqual(0, mapped.countRegion(Region(0,0,64,64)))
+        
+        with open(path, 'wb') as f:
+            f.write(b'not a quadtree')
+        with self.assertRaises(ValueError):
+            QuadTree.openMmap(path)
+        os.remove(path)
+        os.rmdir(os.path.dirname(path))
+    
 if __name__ == '__main__':
     unittest.main()    
\ No newline at end of file
@@ -49,6 +49,20 @@ class TestQuadPointMethods(unittest.TestCase):
     
         for pt in self.qt:
             self.assertTrue(pt in points)
+    
+    def test_expand(self):
+        self.qt = QuadTree(Region(0,0,16,16), expand=True)
+        points = set()
+        for _ in range(200):
+            pt = (random.randint(-3000,3000), random.randint(-3000,3000))
+            points.add(pt)
+            self.qt.add(pt)
+        
+        self.assertEqual(points, set(self.qt))
+        for pt in points:
+            self.assertTrue(pt in self.qt)
+            self.assertTrue(self.qt.remove(pt))
+        self.assertFalse(QuadTree(Region(0,0,16,16)).add((20, 20)))
         
     
 if __name__ == '__main__':